@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import time
+import operator
+from functools import reduce
+from posym import SymmetryMolecule, SymmetryNormalModes
+from hess_parser import HessianData
+from degeneracy import (DEGENERACY_TOL, COEFF_TOL, group_modes, block_labels,
+                        decompose)
+
+#GLOBAL CONSTANTS
+#Translations and rotations, skipped as in mode_sym.py
+N_SKIP = 6
+
+#FUNCTIONS
+#Labels of the blocks from the measures of all the modes (traces)
+def trace_labels(symmetry,blocks):
+    _all = symmetry(list(range(blocks[-1][-1]+1)))
+    return [str(reduce(operator.add,[_all.get_state_mode(i) for i in modes]))
+            for modes in blocks]
+
+def same(label,other):
+    a, b = decompose(label), decompose(other)
+    return (a.keys() == b.keys() and
+            all(abs(a[k]-b[k]) <= COEFF_TOL for k in a))
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='check_blocks',\
+        description='Compare the block labels of mode_sym.py -b with the '
+                    'traces over all the measured modes, and time both')
+
+#File is required
+parser.add_argument("filename",
+        nargs=1,
+        help="the .hess file")
+
+#Point group is required
+parser.add_argument("-gr","--group",
+        type=str, required=True,
+        help="select the point group of the molecule")
+
+parser.add_argument("-dt","--deg_tol",
+        type=float, default=DEGENERACY_TOL,
+        help="modes within <ARG> cm-1 are degenerate")
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    hessian = HessianData(args.filename[0])
+    modes = hessian.normal_modes[N_SKIP:]
+    freq = hessian.freq[N_SKIP:]
+    angles = SymmetryMolecule(args.group,hessian.atoms,
+                              hessian.symbol).orientation_angles
+
+    def symmetry(index):
+        return SymmetryNormalModes(group=args.group,
+                                   coordinates=hessian.atoms,
+                                   modes=modes[index],
+                                   symbols=hessian.symbol,
+                                   orientation_angles=angles)
+
+    blocks = group_modes(freq,args.deg_tol)
+    tic = time.perf_counter()
+    traces = trace_labels(symmetry,blocks)
+    t_trace = time.perf_counter()-tic
+    tic = time.perf_counter()
+    labels, n_measured = block_labels(symmetry,blocks)
+    t_block = time.perf_counter()-tic
+
+    failed = 0
+    for modes_k, label, trace in zip(blocks,labels,traces):
+        if not same(label,trace):
+            print(f"Modes {modes_k[0]+N_SKIP+1}-{modes_k[-1]+N_SKIP+1}: "
+                  f"{label} instead of {trace}")
+            failed += 1
+    print(f"{len(blocks):d} blocks - all modes: {len(freq):d} measured in "
+          f"{t_trace:0.4f} seconds, blocks: {n_measured:d} measured in "
+          f"{t_block:0.4f} seconds ({t_trace/t_block:0.1f}x)")
+    if failed:
+        print(f"Warning. {failed} block(s) labelled differently. Exit.")
+        sys.exit(1)
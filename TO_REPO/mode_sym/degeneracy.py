@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+
+import re
+import operator
+from functools import reduce
+import numpy as np
+
+#GLOBAL CONSTANTS
+#Modes within DEGENERACY_TOL (cm-1) of the previous one are in the same block
+DEGENERACY_TOL = 0.1
+#Blocks closer than NEAR_TOL (cm-1) to the next one are flagged
+NEAR_TOL = 1.0
+#Largest distance of an irrep coefficient to an integer
+COEFF_TOL = 0.05
+#Dimension of the irreps, by the first letter of their Mulliken label
+IRREP_DIM = {"A": 1, "B": 1, "E": 2, "T": 3, "F": 3, "G": 4, "H": 5}
+
+#FUNCTIONS
+#Degenerate blocks - lists of the indices of consecutive modes whose
+#frequencies (sorted) are within tol of the previous one
+def group_modes(freq,tol=DEGENERACY_TOL):
+    _split = np.flatnonzero(np.abs(np.diff(freq)) > tol)+1
+    return [b.tolist() for b in np.split(np.arange(len(freq)),_split)]
+
+#Irreps and coefficients of a decomposition printed by posym - "0.2 Hg",
+#"Ag + Hg" ...
+def decompose(label):
+    irreps = {}
+    for sign, coeff, irrep in re.findall(r"([+-]?)\s*(\d*\.?\d*)\s*([A-Z]\S*)",
+                                         str(label)):
+        _c = float(coeff) if coeff else 1.0
+        irreps[irrep] = irreps.get(irrep,0.0)+(-_c if sign == "-" else _c)
+    return irreps
+
+def irrep_dim(irrep):
+    return IRREP_DIM.get(irrep[0].upper(),1)
+
+#Problems of the decomposition of a block of n modes
+# "fractional": the block does not span whole irreps (tolerance too tight, or
+#   modes mixed by a distorted geometry)
+# "accidental": several irreps in one block (accidental degeneracy)
+# "dimension": the irreps do not add up to n modes
+def check_block(irreps,n):
+    flags = []
+    _coeffs = np.array(list(irreps.values()))
+    if np.any(np.abs(_coeffs-np.round(_coeffs)) > COEFF_TOL):
+        flags.append("fractional")
+    if len(irreps) > 1:
+        flags.append("accidental")
+    _dim = sum(c*irrep_dim(ir) for ir, c in irreps.items())
+    if abs(_dim-n) > COEFF_TOL*n:
+        flags.append("dimension")
+    return flags
+
+#Irrep of a block of n modes from the decomposition of one of its modes -
+#None unless the mode lies in a single irrep of dimension n
+# A mode q of an irrep G has the coefficient |P_G q|^2/dim(G) = 1/dim(G) in
+# G ("0.2 Hg"). If the block has the dimension of G, it is exactly G.
+def pure_label(irreps,n):
+    if len(irreps) != 1:
+        return None
+    irrep, coeff = next(iter(irreps.items()))
+    if irrep_dim(irrep) != n or abs(coeff*n-1) > COEFF_TOL:
+        return None
+    return irrep
+
+#Symmetry of each degenerate block of modes, analysed once as a subspace
+# symmetry(modes): posym SymmetryNormalModes of some modes (indices of freq),
+# in a fixed orientation. Returns the rows of block_rows and the number of
+# modes measured by posym.
+def block_symmetry(symmetry,freq,tol=DEGENERACY_TOL,near_tol=NEAR_TOL):
+    blocks = group_modes(freq,tol)
+    labels, n_measured = block_labels(symmetry,blocks)
+    return [block_rows(freq,blocks,labels,near_tol),n_measured]
+
+#Irreps of the blocks, as printed by posym, and the number of modes measured
+# posym only measures the first mode of each block: that is enough for the
+# blocks spanning one irrep of their dimension (pure_label). The others
+# (accidental degeneracies, split sets, repeated irreps) are measured on all
+# their modes. Their characters are the traces of their representation,
+# i.e. the sums of the characters of their modes, and they are decomposed
+# once into whole irreps instead of once per mode into fractions of them.
+def block_labels(symmetry,blocks):
+    _first = symmetry([modes[0] for modes in blocks])
+    labels = [pure_label(decompose(_first.get_state_mode(k)),len(modes))
+              for k, modes in enumerate(blocks)]
+    _mixed = [k for k, label in enumerate(labels) if label is None]
+    n_measured = len(blocks)
+    if _mixed:
+        _modes = [i for k in _mixed for i in blocks[k]]
+        _all = symmetry(_modes)
+        _start = 0
+        for k in _mixed:
+            _n = len(blocks[k])
+            labels[k] = str(reduce(operator.add,
+                                   [_all.get_state_mode(i) for i
+                                    in range(_start,_start+_n)]))
+            _start += _n
+        n_measured += len(_modes)
+    return [labels,n_measured]
+
+#Sum of the irreps of the blocks, as posym prints it
+def total_label(labels):
+    total = {}
+    for label in labels:
+        for irrep, coeff in decompose(label).items():
+            total[irrep] = total.get(irrep,0.0)+coeff
+    return " + ".join(irrep if c == 1 else f"{c:g} {irrep}"
+                      for irrep, c in total.items())
+
+#Blocks with their mean frequency, spread, irrep and flags
+def block_rows(freq,blocks,labels,near_tol=NEAR_TOL):
+    rows = list()
+    for k, (modes, label) in enumerate(zip(blocks,labels)):
+        flags = check_block(decompose(label),len(modes))
+        #near-degeneracy with the next block
+        if k+1 < len(blocks):
+            _gap = freq[blocks[k+1][0]]-freq[modes[-1]]
+            if abs(_gap) < near_tol:
+                flags.append(f"near {_gap:0.3f} cm-1")
+        rows.append({
+                "modes": modes,
+                "freq": float(np.mean(freq[modes])),
+                "spread": float(np.ptp(freq[modes])),
+                "irrep": label,
+                "flags": flags
+                })
+    return rows
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from hess_parser import HessianData
+from hess_cache import HessianCache
+from legacy.hess_parser_v1 import HessianData as HessianDataV1
+
+#GLOBAL CONSTANTS
+ATTRIBUTES = ["natom","symbol","atoms","normal_modes","freq"]
+
+#FUNCTIONS
+#Best time (s) of repeat parses of path, and the last parsed object
+# The attributes are accessed inside the timing, as the sections of
+# HessianData are only parsed on first access.
+def best_time(cls,path,repeat,**kwargs):
+    best = np.inf
+    for i in range(repeat):
+        tic = time.perf_counter()
+        hessian = cls(path,**kwargs)
+        for name in ATTRIBUTES:
+            getattr(hessian,name)
+        best = min(best,time.perf_counter()-tic)
+    return [best,hessian]
+
+#Attributes which differ between two parsed objects
+def mismatches(new,old):
+    return [name for name in ATTRIBUTES
+            if not np.array_equal(getattr(new,name),getattr(old,name))]
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hess_benchmark',\
+        description='Time the .hess parser against the previous one and '
+                    'the cached loads, and check that all give the same data')
+
+#Files are required
+parser.add_argument("filename",
+        nargs='+',
+        help="the .hess files")
+
+parser.add_argument('-r','--repeat',
+        type=int, default=3,
+        help='best of <ARG> parses per file')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    #cached loads in a temporary cache
+    cache = HessianCache(tempfile.mkdtemp())
+
+    failed = 0
+    print(f"{'file':<40}{'natom':>6}{'v1 (s)':>10}{'new (s)':>10}"
+          f"{'cached (s)':>12}{'speedup':>9}")
+    for path in args.filename:
+        t_old, old = best_time(HessianDataV1,path,args.repeat)
+        t_new, new = best_time(HessianData,path,args.repeat)
+        best_time(HessianData,path,1,cache=cache)
+        t_hit, hit = best_time(HessianData,path,args.repeat,cache=cache)
+        diff = sorted(set(mismatches(new,old)+mismatches(hit,old)))
+        print(f"{path[-38:]:<40}{new.natom:>6d}{t_old:>10.4f}{t_new:>10.4f}"
+              f"{t_hit:>12.4f}{t_old/t_new:>9.1f}"
+              +(f"  differs: {', '.join(diff)}" if diff else ""))
+        if diff:
+            failed += 1
+    shutil.rmtree(cache.cache_dir)
+
+    if failed:
+        print(f"Warning. {failed} file(s) parsed differently. Exit.")
+        sys.exit(1)
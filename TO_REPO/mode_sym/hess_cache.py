@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+
+import os
+import hashlib
+import tempfile
+import contextlib
+import numpy as np
+
+#GLOBAL CONSTANTS
+#Bump when the stored arrays change
+CACHE_VERSION = 2
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"),".cache","mode_sym")
+HASH_BLOCK = 1024**2   #bytes
+STAMP_EXT = ".stamp"
+
+class HessianCache(object):
+    """
+    On-disk cache of the parsed sections of .hess files.
+
+    Each file has an "index" .npz entry, named after the hash of its
+    absolute path, holding its section index and the size, mtime and
+    SHA-256 of the file when it was indexed, and one .npz entry per parsed
+    section, written when the section is first parsed. The index entry is
+    valid while the size and mtime are unchanged; if only the mtime changed
+    (copy, touch), the file is hashed and the entry is kept if the content
+    is the same. A section entry is valid if it was parsed from a file of
+    the SHA-256 of a valid index entry.
+    """
+
+    def __init__(self,cache_dir=None):
+
+        if cache_dir is None:
+            cache_dir = os.environ.get("MODE_SYM_CACHE_DIR",DEFAULT_DIR)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+
+    def path(self,path,name="index"):
+        _key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(self.cache_dir,f"{_key}.{name}.npz")
+
+
+    def valid(self,path):
+        """
+        SHA-256 of the file if the index entry of path exists and matches
+        the file, else None.
+        """
+        size, mtime = file_stamp(path)
+        try:
+            with np.load(self.path(path)) as data:
+                if int(data["version"]) != CACHE_VERSION:
+                    return None
+                stamp = data["stamp"].tolist()
+                sha = str(data["sha256"])
+        except (OSError, ValueError, EOFError, KeyError):
+            return None
+        if stamp[0] != size:
+            return None
+        if stamp[1] == mtime:
+            return sha
+        if file_hash(path) != sha:
+            return None
+        self.restamp(path)
+        return sha
+
+
+    def load(self,path,name,key,sha=None):
+        """
+        Stored array key of the entry name of path - None if the entry is
+        missing, or was not parsed from a file of SHA-256 sha.
+        """
+        try:
+            with np.load(self.path(path,name)) as data:
+                if (int(data["version"]) != CACHE_VERSION or
+                        (sha is not None and str(data["sha256"]) != sha)):
+                    return None
+                return data[key]
+        except (OSError, ValueError, EOFError, KeyError):
+            return None
+
+
+    def store(self,path,name,sha,**arrays):
+        # Atomic replace - several processes may share the directory.
+        with atomic_write(self.path(path,name)) as f:
+            np.savez_compressed(f,version=CACHE_VERSION,
+                                stamp=np.array(file_stamp(path)),
+                                sha256=sha,**arrays)
+
+
+    def restamp(self,path):
+        """
+        Store the index entry again with the current mtime of the file - the
+        section entries are keyed by the SHA-256 only.
+        """
+        with np.load(self.path(path)) as data:
+            sha = str(data["sha256"])
+            arrays = {k: data[k] for k in data.files
+                      if k not in ("version","stamp","sha256")}
+        self.store(path,"index",sha,**arrays)
+
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                os.remove(entry.path)
+
+###############################################################################
+#FUNCTIONS
+#SHA-256 of the content of a file
+def file_hash(path):
+    _h = hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK),b""):
+            _h.update(block)
+    return _h.hexdigest()
+
+#Size and mtime (ns) of a .hess file, as stored in the index entries and
+#the .stamp of the .hessian.npy sidecars
+def file_stamp(path):
+    _stat = os.stat(path)
+    return [_stat.st_size,_stat.st_mtime_ns]
+
+#Stamp saved with the sidecar side (side+STAMP_EXT) - None if it is missing
+#or unreadable, so that the sidecar is written again
+def read_stamp(side):
+    try:
+        with open(side+STAMP_EXT) as f:
+            return [int(v) for v in f.read().split()]
+    except (OSError, ValueError):
+        return None
+
+#Write path through a temporary file of its directory, renamed over path
+#when the block completes - a mode_sym_batch worker loading a cache entry or
+#a sidecar that another one is writing gets the old file or the new one,
+#never a truncated .npz/.npy
+@contextlib.contextmanager
+def atomic_write(path,mode="wb"):
+    _dir = os.path.dirname(os.path.abspath(path))
+    _tmp = tempfile.NamedTemporaryFile(mode,dir=_dir,suffix=".tmp",
+                                       delete=False)
+    try:
+        with _tmp:
+            yield _tmp
+        os.replace(_tmp.name,path)
+    except BaseException:
+        os.remove(_tmp.name)
+        raise
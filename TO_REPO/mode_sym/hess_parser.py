@@ -1,136 +1,283 @@
 #!/usr/bin/python3
 
+import os
+import mmap
 import numpy as np
-#np.warnings.filterwarnings('ignore', category=np.VisibleDeprecationWarning)
+from hess_cache import STAMP_EXT, file_hash, file_stamp, read_stamp, \
+                       atomic_write
 
+#GLOBAL CONSTANTS
 NDIM = 3
+SIDECAR_EXT = ".hessian.npy"
+
+class MatrixBlock(object):
+    """
+    Section written by ORCA as column blocks ($hessian, $normal_modes): the
+    size line, then for each block a line of column indices followed by one
+    indexed row per line. The rows are filled block by block into an array
+    preallocated from the size line.
+    """
+
+    def __init__(self):
+
+        self.array = None
+        self._cols = []
+        self._rows = []
+
+
+    def feed(self,line):
+        fields = line.split()
+        if not fields:
+            return
+        if self.array is None:
+            nrow = int(fields[0])
+            ncol = int(fields[1]) if len(fields) > 1 else nrow
+            self.array = np.empty((nrow,ncol))
+        elif "." in line:
+            self._rows.append(fields[1:])
+        else:
+            self.flush()
+            self._cols = [int(x) for x in fields]
+
+
+    def flush(self):
+        if self._rows:
+            self.array[:,self._cols[0]:self._cols[-1]+1] = \
+                    np.array(self._rows,dtype=float)
+            self._rows = []
+
+
+    def result(self):
+        self.flush()
+        return self.array
+
+
+class TableBlock(object):
+    """
+    Section written as the size line and one row per line ($atoms,
+    $vibrational_frequencies, $ir_spectrum ...) - array of the fields as
+    strings, one row per line, or as floats if numeric.
+    """
+
+    def __init__(self):
+
+        self.size = None
+        self._rows = []
+
+
+    def feed(self,line):
+        fields = line.split()
+        if not fields:
+            return
+        if self.size is None:
+            self.size = int(fields[0])
+        elif len(self._rows) < self.size:
+            self._rows.append(fields)
+
+
+    def result(self):
+        table = np.array(self._rows)
+        try:
+            return table.astype(float)
+        except ValueError:
+            return table
+
+
+#Layout of the sections read by HessianData
+SECTIONS = {
+        "$hessian": MatrixBlock,
+        "$vibrational_frequencies": TableBlock,
+        "$normal_modes": MatrixBlock,
+        "$atoms": TableBlock,
+        "$dipole_derivatives": TableBlock,
+        "$ir_spectrum": TableBlock,
+        "$polarizability_derivatives": TableBlock,
+        "$raman_spectrum": TableBlock
+        }
 
 class HessianData(object):
     """
     Object which will contain the unperturbed xyz coordinates and the
     normal modes parsed from a hessian file.
+
+    The file is only indexed when the object is created: the byte offsets of
+    every $section are recorded in one scan, and a section is parsed the
+    first time one of its properties is accessed - tools which only need the
+    frequencies do not parse the normal modes or the Hessian. With
+    mmap=True, the Hessian matrix is memory-mapped from a .npy sidecar
+    written on its first parse with the size and mtime of the file (.stamp),
+    and rewritten whenever they change.
+
+    With a HessianCache, the index and each section of SECTIONS are stored
+    in the cache when they are first read; the next loads take them from the
+    cache, as long as the file is unchanged, and only parse the sections
+    never parsed before.
     """
 
-    def __init__(self,path):
+    def __init__(self,path,mmap=False,cache=None):
 
         self.path = path
-        self.data = self.read_data()
-        atoms = self.format_atoms()
-        self.natom = atoms[0]
-        self.symbol = atoms[1]
-        self.atoms = atoms[2]
-        self.normal_modes = self.format_normal_modes()
-        self.freq = self.format_freq()
+        self.mmap = mmap
+        self.cache = cache
+        self._blocks = {}
+        self._sha = None if cache is None else cache.valid(path)
+        if self._sha is not None:
+            self.index = dict(zip(cache.load(path,"index","names").tolist(),
+                                  cache.load(path,"index","offsets").tolist()))
+        else:
+            self.index = self.index_sections()
+            if cache is not None:
+                self._sha = file_hash(path)
+                cache.store(path,"index",self._sha,
+                            names=np.array(list(self.index)),
+                            offsets=np.array(list(self.index.values())))
+
 
+    def index_sections(self):
+        """
+        [start,end] byte offsets of the block of each section, by name.
+        """
+        index = {}
+        with open(self.path,'rb') as f:
+            buf = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+            try:
+                name = None
+                i = buf.find(b"$") if buf[:1] != b"$" else 0
+                while i != -1:
+                    end = buf.find(b"\n",i)
+                    end = len(buf) if end == -1 else end+1
+                    if name is not None:
+                        index[name][1] = i
+                    name = buf[i:end].split()[0].decode()
+                    index[name] = [end,len(buf)]
+                    i = buf.find(b"\n$",end-1)
+                    if i != -1:
+                        i += 1
+            finally:
+                buf.close()
+        return index
 
-    def read_data(self):
-        with open(self.path,'r') as f:
-            lines = [line.rstrip() for line in f]
-        return lines
 
+    def section(self,name):
+        """
+        Parsed block of a section, read from the cache or the file on the
+        first call - a section of SECTIONS parsed from the file is stored in
+        the cache.
+        """
+        if name not in self._blocks:
+            if name not in self.index:
+                raise ValueError(f"{self.path}: no {name} section")
+            if self.cache is None or name not in SECTIONS:
+                self._blocks[name] = self.parse_section(name)
+                return self._blocks[name]
+            block = self.cache.load(self.path,name[1:],"block",self._sha)
+            if block is None:
+                block = self.parse_section(name)
+                self.cache.store(self.path,name[1:],self._sha,block=block)
+            self._blocks[name] = block
+        return self._blocks[name]
 
-    def i_or_f(self,x):
+
+    def parse_section(self,name):
         """
-        Formats the raw parsed data according to the length of the string.
+        Block of a section parsed from the file - the sections missing from
+        SECTIONS ($act_energy ...) as their text.
         """
-        if "." in x:
-            result = float(x)
-        else:
-            result = int(x)
-        return result
+        start, end = self.index[name]
+        with open(self.path,'rb') as f:
+            f.seek(start)
+            text = f.read(end-start).decode()
+        if name not in SECTIONS:
+            return text.strip()
+        block = SECTIONS[name]()
+        for line in text.splitlines():
+            if not line.startswith("#"):
+                block.feed(line)
+        return block.result()
+
+
+    def has_section(self,name):
+        return name in self.index
+
+
+    @property
+    def natom(self):
+        return format_atoms(self.section("$atoms"))[0]
+
+
+    @property
+    def symbol(self):
+        return format_atoms(self.section("$atoms"))[1]
+
+
+    @property
+    def atoms(self):
+        return format_atoms(self.section("$atoms"))[2]
 
 
-    def format_matrix(self,parsed):
+    @property
+    def normal_modes(self):
+        return format_normal_modes(self.section("$normal_modes"),self.natom)
+
+
+    @property
+    def freq(self):
+        return format_freq(self.section("$vibrational_frequencies"))
+
+
+    @property
+    def hessian(self):
+        """
+        Cartesian Hessian (3N,3N) in Eh/bohr^2.
+        """
+        if not self.mmap:
+            return self.section("$hessian")
+        if "$hessian" not in self._blocks:
+            _side = self.path+SIDECAR_EXT
+            _stamp = file_stamp(self.path)
+            if not (os.path.exists(_side) and read_stamp(_side) == _stamp):
+                with atomic_write(_side) as f:
+                    np.save(f,self.section("$hessian"))
+                with atomic_write(_side+STAMP_EXT,"w") as f:
+                    f.write(f"{_stamp[0]:d} {_stamp[1]:d}\n")
+            self._blocks["$hessian"] = np.load(_side,mmap_mode="r")
+        return self._blocks["$hessian"]
+
+
+    @property
+    def dipole_derivatives(self):
+        """
+        Dipole derivatives (3N,3): one row per Cartesian displacement.
         """
+        return self.section("$dipole_derivatives")
 
+
+    @property
+    def ir_spectrum(self):
         """
-        mat = [[]]
-        for line in parsed:
-            if all([isinstance(item, int) for item in line]):
-                mat[0].extend(line)
-            else:
-                i = line[0]+1
-                if len(mat) < i+1:
-                    mat.append([])
-                mat[i].extend(line[1:])
-        return mat
-
-
-    def format_atoms(self):
-        parsed = self.data
-        atoms = []
-        symbols = []
-        current_line = []
-        parse = False
-        for line in parsed:
-            if line.startswith("$atoms"):
-                parse = True
-            elif parse:
-                if line.startswith("$actual_temperature"):
-                    atoms.append(current_line)
-                    current_line = []
-                    parse = False
-                else:
-                    current_line.append(line.splitlines())
-            else:
-                continue
-        atoms = [x for x in atoms[0] if x != []]
-        natom = int(atoms[0][0])
-        atoms = [x[0].split() for x in atoms][1:]
-        symbols = np.array([x[0] for x in atoms])
-        atoms = np.array([x[2:] for x in atoms]).astype(float)
-        return natom, symbols, atoms
-
-
-    def format_normal_modes(self):
+        IR spectrum (3N,6): wavenumber, eps, Int, TX, TY, TZ.
         """
-        Format the raw normal modes taken from the ORCA output.
+        return self.section("$ir_spectrum")
 
-        Args:
-            parsed (list): List of raw parsed lines taken from the output file.
 
-        Returns:
-            ???
+    @property
+    def raman_spectrum(self):
+        """
+        Raman spectrum (3N,3): wavenumber, activity, depolarization.
         """
-        parsed = self.data
-        normal_modes = []
-        current_mode = []
-        parse = False
-        for line in parsed:
-            if line.startswith("$normal_modes"):
-                parse = True
-            elif parse:
-                if line.startswith("#"):
-                    normal_modes.append(current_mode)
-                    current_mode = []
-                    parse = False
-                else:
-                    current_mode.append([self.i_or_f(x) for x in line.split()])
-            else:
-                continue
-        normal_modes = [x for x in normal_modes[0] if x != []]
-        normal_modes = self.format_matrix(normal_modes[1:])
-        normal_modes = np.array(normal_modes)[1:].transpose()
-        return normal_modes.reshape(len(normal_modes),self.natom,NDIM)
-
-    def format_freq(self):
-        parsed = self.data
-        freq = []
-        current_line = []
-        parse = False
-        for line in parsed:
-            if line.startswith("$vibrational_frequencies"):
-                parse = True
-            elif parse:
-                if line.startswith("$normal_modes"):
-                    freq.append(current_line)
-                    current_line = []
-                    parse = False
-                else:
-                    current_line.append(line.splitlines())
-            else:
-                continue
-        freq = [x for x in freq[0] if x != []]
-        freq = [x[0].split() for x in freq][1:]
-        freq = np.array([x[1] for x in freq]).astype(float)
-        return freq
+        return self.section("$raman_spectrum")
+
+###############################################################################
+#FUNCTIONS
+#Number of atoms, symbols and xyz coordinates (bohr) of the $atoms table
+def format_atoms(table):
+    return [len(table), table[:,0], table[:,2:].astype(float)]
+
+#Normal modes (mode, atom, xyz) of the $normal_modes matrix, whose columns
+#are the modes
+def format_normal_modes(matrix,natom):
+    return matrix.T.reshape(matrix.shape[1],natom,NDIM)
+
+#Frequencies (cm-1) of the $vibrational_frequencies table
+def format_freq(table):
+    return table[:,1].astype(float)
@@ -1,7 +1,11 @@
 #!/usr/bin/python3
 from hess_parser import HessianData
-from posym import SymmetryNormalModes
+from hess_cache import HessianCache
+from degeneracy import (DEGENERACY_TOL, NEAR_TOL, block_symmetry,
+                        total_label)
+from posym import SymmetryMolecule, SymmetryNormalModes
 import argparse
+import time
 
 #create parser
 parser = argparse.ArgumentParser(prog='mode_sym',\
@@ -19,13 +23,51 @@ parser.add_argument("-gr","--group",
                     help="select the point group of the molecule"
                     )
 
+#degenerate blocks instead of modes
+parser.add_argument("-b","--blocks",
+                    default=0,
+                    action="store_true",
+                    help="analyse the blocks of degenerate modes as subspaces"
+                    )
+
+#degeneracy tolerance
+parser.add_argument("-dt","--deg_tol",
+                    type=float,
+                    default=DEGENERACY_TOL,
+                    help="modes within <ARG> cm-1 are degenerate (default: "
+                         "{:g})".format(DEGENERACY_TOL)
+                    )
+
+#near-degeneracy tolerance
+parser.add_argument("-nt","--near_tol",
+                    type=float,
+                    default=NEAR_TOL,
+                    help="flag blocks within <ARG> cm-1 of the next one "
+                         "(default: {:g})".format(NEAR_TOL)
+                    )
+
+#parsed data are cached
+parser.add_argument("-nc","--nocache",
+                    default=1,
+                    action="store_false",
+                    help="do not use the cache of the parsed .hess files"
+                    )
+
+#cache directory
+parser.add_argument("-cd","--cache_dir",
+                    type=str,
+                    help="cache directory (default: $MODE_SYM_CACHE_DIR or "
+                         "~/.cache/mode_sym)"
+                    )
+
 #parse arguments
 args = parser.parse_args()
 path = args.filename[0]
 gr = "{:s}".format(args.group)
 
 #parse hessian data
-hessian = HessianData(path)
+cache = HessianCache(args.cache_dir) if args.nocache else None
+hessian = HessianData(path,cache=cache)
 
 #extract required information from ORCA calculation
 coordinates = hessian.atoms
@@ -33,10 +75,33 @@ symbols = hessian.symbol
 normal_modes = hessian.normal_modes[6:]
 frequencies = hessian.freq[6:]
 
-sym_modes_gs = SymmetryNormalModes(group=gr, coordinates=coordinates,
-                                   modes=normal_modes, symbols=symbols)
-for i in range(len(normal_modes)):
-    print('Mode {:2}: {:8.3f} :'.format(i + 7, frequencies[i]),
-          sym_modes_gs.get_state_mode(i))
+tic = time.perf_counter()
+if args.blocks:
+    #molecule oriented once, posym only measures the modes it is given
+    angles = SymmetryMolecule(gr, coordinates, symbols).orientation_angles
+
+    def symmetry(modes):
+        return SymmetryNormalModes(group=gr, coordinates=coordinates,
+                                   modes=normal_modes[modes], symbols=symbols,
+                                   orientation_angles=angles)
 
-print('Total symmetry: ', sym_modes_gs)
+    rows, n_measured = block_symmetry(symmetry, frequencies, args.deg_tol,
+                                      args.near_tol)
+    for row in rows:
+        modes = "{:d}-{:d}".format(row["modes"][0] + 7, row["modes"][-1] + 7)
+        line = 'Modes {:>7}: {:8.3f} : {}'.format(modes, row["freq"],
+                                                  row["irrep"])
+        if row["flags"]:
+            line += '  ! ' + ", ".join(row["flags"])
+        print(line)
+    print('Total symmetry: ', total_label([row["irrep"] for row in rows]))
+    print('{:d} blocks, posym measures on {:d} of {:d} modes'.format(
+          len(rows), n_measured, len(normal_modes)))
+else:
+    sym_modes_gs = SymmetryNormalModes(group=gr, coordinates=coordinates,
+                                       modes=normal_modes, symbols=symbols)
+    for i in range(len(normal_modes)):
+        print('Mode {:2}: {:8.3f} :'.format(i + 7, frequencies[i]),
+              sym_modes_gs.get_state_mode(i))
+    print('Total symmetry: ', sym_modes_gs)
+print('Symmetry analysis in {:0.4f} seconds'.format(time.perf_counter() - tic))
@@ -0,0 +1,265 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import glob
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from posym import SymmetryMolecule, SymmetryNormalModes
+from hess_parser import HessianData
+from hess_cache import HessianCache
+from degeneracy import (DEGENERACY_TOL, NEAR_TOL, group_modes, block_labels,
+                        block_rows)
+
+#GLOBAL CONSTANTS
+#Translations and rotations, skipped as in mode_sym.py
+N_SKIP = 6
+#Molecule, point group and method of FRQ_c100-D5d_f.hess, RAM_c60-Ih_r.hess,
+#FRQ_c60_f_B3LYP.hess, RAM_c100_r2SCAN.hess ...
+NAME_PATTERN = re.compile(r"^[A-Z]+_(.+?)(?:-([A-Z][A-Za-z0-9]*))?(?:_[a-z])?"
+                          r"(?:_([A-Za-z0-9]*[A-Z][A-Za-z0-9]*))?\.hess$")
+#Modes per task when the blocks of a file are split over the pool
+CHUNK_MODES = 60
+
+#GLOBAL LIST
+header1 = ["file","molecule","group","basis","method","mode","freq","irrep",
+           "block","flags"]
+
+#FUNCTIONS
+#.hess files of directories (recursively) and glob patterns
+def list_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item,"**","*.hess"),
+                                          recursive=True)))
+        else:
+            files.extend(sorted(glob.glob(item)))
+    return files
+
+#Molecule, point group (None if not in the name), basis (directory) and
+#method of a .hess file
+def file_info(path):
+    _name = os.path.basename(path)
+    _m = NAME_PATTERN.match(_name)
+    if _m is None:
+        mol, group, method = os.path.splitext(_name)[0], None, None
+    else:
+        mol, group, method = _m.groups()
+    return {
+            "path": path,
+            "molecule": mol,
+            "group": group,
+            "basis": os.path.basename(os.path.dirname(os.path.abspath(path))),
+            "method": method or ""
+            }
+
+#Point group of the files without one in their name - from the given groups
+#(molecule: group), else from the other files of the same molecule if they
+#all have the same group (isomers have different groups, e.g. c84-D2 and
+#c84-D2d: the group is then left to -gr)
+def assign_groups(infos,given):
+    named = {}
+    for info in infos:
+        if info["group"]:
+            named.setdefault(info["molecule"].lower(),set()).add(info["group"])
+    given = {mol.lower(): group for mol, group in given.items()}
+    for info in infos:
+        if info["group"]:
+            continue
+        _mol = info["molecule"].lower()
+        if _mol in given:
+            info["group"] = given[_mol]
+        elif len(named.get(_mol,())) == 1:
+            info["group"] = next(iter(named[_mol]))
+            print(f"Point group {info['group']} of {info['path']} inferred "
+                  f"from the other {info['molecule']} files")
+        elif _mol in named:
+            print(f"Warning. Several point groups for {info['molecule']} "
+                  f"({', '.join(sorted(named[_mol]))}).")
+    return infos
+
+#Consecutive blocks of about size modes - whole blocks only
+def chunk_blocks(blocks,size):
+    chunks = [[]]
+    n = 0
+    for modes in blocks:
+        if size and n >= size:
+            chunks.append([])
+            n = 0
+        chunks[-1].append(modes)
+        n += len(modes)
+    return chunks
+
+def load(path,args):
+    cache = HessianCache(args.cache_dir) if args.nocache else None
+    return HessianData(path,cache=cache)
+
+#Frequencies, degenerate blocks and orientation of the molecule in its point
+#group - None if the file cannot be read
+def prepare(info,args):
+    try:
+        hessian = load(info["path"],args)
+        freq = hessian.freq[N_SKIP:]
+        _sm = SymmetryMolecule(info["group"],hessian.atoms,hessian.symbol)
+    except Exception as err:
+        print(f"Warning. {info['path']} failed: {err}")
+        return None
+    return [freq,group_modes(freq,args.deg_tol),_sm.orientation_angles]
+
+#Irreps of some blocks of a file, in the orientation found by prepare - None
+#if posym fails
+# posym only measures the modes of these blocks (block_labels), so the
+# blocks of one file can be labelled by several workers.
+def label_chunk(path,group,angles,blocks,args):
+    try:
+        hessian = load(path,args)
+        _modes = hessian.normal_modes[N_SKIP:]
+
+        def symmetry(modes):
+            return SymmetryNormalModes(group=group,
+                                       coordinates=hessian.atoms,
+                                       modes=_modes[modes],
+                                       symbols=hessian.symbol,
+                                       orientation_angles=angles)
+
+        return block_labels(symmetry,blocks)[0]
+    except Exception as err:
+        print(f"Warning. {path} failed on modes {blocks[0][0]+N_SKIP+1}-"
+              f"{blocks[-1][-1]+N_SKIP+1}: {err}")
+        return None
+
+def pool_map(pool,fct,*iterables):
+    if pool is None:
+        return list(map(fct,*iterables))
+    return list(pool.map(fct,*iterables))
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='mode_sym_batch',\
+        description='Symmetry labels of the normal modes of a set of .hess '
+                    'files, by degenerate blocks, into one table')
+
+#Directories or glob patterns are required
+parser.add_argument("inputs",
+        nargs='+',
+        help="directories (searched recursively) or glob patterns of .hess "
+             "files - the point group is read from the name, e.g. "
+             "FRQ_c100-D5d_f.hess")
+
+parser.add_argument('-gr','--group',
+        type=str, nargs='+', default=[],
+        help='point groups of the molecules without one in their file names, '
+             'as <molecule>=<group>, e.g. c78=D3h - inferred only if all the '
+             'other files of the molecule have the same group')
+
+parser.add_argument('-o','--output',
+        type=str, default="mode_sym",
+        help='output the table to <ARG>.csv')
+
+parser.add_argument('-j','--jobs',
+        type=int, default=os.cpu_count(),
+        help='number of processes')
+
+parser.add_argument('-cm','--chunk_modes',
+        type=int, default=CHUNK_MODES,
+        help='split the blocks of a file into tasks of about <ARG> modes, 0 '
+             'for one task per file')
+
+parser.add_argument('-dt','--deg_tol',
+        type=float, default=DEGENERACY_TOL,
+        help='modes within <ARG> cm-1 are degenerate')
+
+parser.add_argument('-nt','--near_tol',
+        type=float, default=NEAR_TOL,
+        help='flag blocks within <ARG> cm-1 of the next one')
+
+parser.add_argument('-nc','--nocache',
+        default=1, action='store_false',
+        help='do not use the cache of the parsed .hess files')
+
+parser.add_argument('-cd','--cache_dir',
+        type=str,
+        help='cache directory')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    try:
+        given = dict(item.split("=",1) for item in args.group)
+    except ValueError:
+        print("Warning. -gr expects <molecule>=<group>. Exit.")
+        sys.exit(1)
+
+    infos = assign_groups([file_info(p) for p in list_files(args.inputs)],
+                          given)
+    for info in infos:
+        if not info["group"]:
+            print(f"Warning. No point group for {info['path']} (-gr "
+                  f"{info['molecule']}=<group>), skipped.")
+    infos = [info for info in infos if info["group"]]
+    if not infos:
+        print("Warning. No .hess file to label. Exit.")
+        sys.exit(1)
+
+    tic = time.perf_counter()
+    n_jobs = max(1,args.jobs)
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        prepared = pool_map(pool,prepare,infos,[args]*len(infos))
+        _ok = [prep is not None for prep in prepared]
+        infos = [info for info, ok in zip(infos,_ok) if ok]
+        prepared = [prep for prep, ok in zip(prepared,_ok) if ok]
+        if not infos:
+            print("Warning. No .hess file could be read. Exit.")
+            sys.exit(1)
+        #one task per chunk of blocks, over all the files
+        tasks = []
+        for k, (info, (freq, blocks, angles)) in enumerate(zip(infos,
+                                                               prepared)):
+            for chunk in chunk_blocks(blocks,args.chunk_modes):
+                tasks.append([k,info["path"],info["group"],angles,chunk])
+        _k, _paths, _groups, _angles, _chunks = zip(*tasks)
+        labels = pool_map(pool,label_chunk,_paths,_groups,_angles,_chunks,
+                          [args]*len(tasks))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    toc = time.perf_counter()
+
+    #one row per mode, with the irrep of its block - the files with a failed
+    #chunk are left out
+    rows = list()
+    failed = 0
+    for k, (info, (freq, blocks, angles)) in enumerate(zip(infos,prepared)):
+        _chunks = [chunk_labels for i, chunk_labels in zip(_k,labels)
+                   if i == k]
+        if any(chunk_labels is None for chunk_labels in _chunks):
+            print(f"{info['path'][-48:]:<50}{info['group']:<6} failed")
+            failed += 1
+            continue
+        _labels = [label for chunk_labels in _chunks for label in chunk_labels]
+        _blocks = block_rows(freq,blocks,_labels,args.near_tol)
+        for block in _blocks:
+            _range = f"{block['modes'][0]+N_SKIP+1}-" \
+                     f"{block['modes'][-1]+N_SKIP+1}"
+            for i in block["modes"]:
+                rows.append([os.path.basename(info["path"]),info["molecule"],
+                             info["group"],info["basis"],info["method"],
+                             i+N_SKIP+1,freq[i],block["irrep"],_range,
+                             "; ".join(block["flags"])])
+        _flagged = sum(1 for block in _blocks if block["flags"])
+        print(f"{info['path'][-48:]:<50}{info['group']:<6}{len(_blocks):>5d} "
+              f"blocks{_flagged:>5d} flagged")
+
+    df = pd.DataFrame(rows,columns=header1)
+    df.to_csv(args.output+".csv", index=False, header=header1)
+    print(f"{len(infos)-failed:d} files, {len(tasks):d} tasks, {len(rows):d} "
+          f"modes labelled in {toc-tic:0.4f} seconds")
+    if failed:
+        print(f"Warning. {failed} file(s) failed.")
@@ -0,0 +1,27 @@
+#!/bin/bash
+
+# Regression check of the adaptive BEADS cutoff search against the dense
+# 1000-point scan, on every chromatogram of a directory.
+# usage: ./check_adaptive.sh [data_dir] [jobs]
+
+DATA_DIR=${1:-data_Steven}
+JOBS=${2:-1}
+SCRIPT_DIR=$(dirname "$(readlink -f "$0")")
+
+failed=0
+for file in "$DATA_DIR"/*.txt; do
+  out=$(MPLBACKEND=Agg python3 "$SCRIPT_DIR/hplc_extract.py" -n -a -ca \
+        -j "$JOBS" "$file")
+  status=$?
+  diff=$(echo "$out" | awk '/^Relative diff.:/{print $3}')
+  solves=$(echo "$out" | awk '/^BEADS solves:/{print $3}')
+  printf "%-75s %6s %8s\n" "$(basename "$file")" "$solves" "$diff"
+  if [ $status -ne 0 ]; then
+    failed=$((failed+1))
+  fi
+done
+
+if [ $failed -ne 0 ]; then
+  echo "$failed file(s) outside of the adaptive tolerance."
+  exit 1
+fi
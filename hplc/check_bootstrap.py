@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import numpy as np
+from chromatogram.fitting import skew_norm
+from chromatogram.bootstrap import FITS, bootstrap
+from chromatogram.synthetic import NOISE
+
+#GLOBAL CONSTANTS
+#Synthetic peak (area, loc, scale, alpha) over SPAN min, as the main peak
+#of the default synthetic trace, with an unresolved shoulder on its tail -
+#the residuals of the fit are structured and skewed, as on the real runs
+PEAK = [6.0, 10.0, 0.25, 2.0]
+SHOULDER = [0.3, 10.9, 0.3, 0.0]
+SPAN = [8.0, 13.0]
+N_POINTS = 500
+
+#FUNCTIONS
+#Noisy peak and shoulder of the given seed
+def synthetic_peak(seed,noise=NOISE):
+    _rng = np.random.default_rng(seed)
+    x = np.linspace(*SPAN,N_POINTS)
+    y = skew_norm(x,PEAK) + skew_norm(x,SHOULDER)
+    return [x,y+_rng.normal(0,noise,N_POINTS)]
+
+#Parameters whose point estimate is outside of its confidence interval
+# (sigma/scale compared as its absolute value, as in bootstrap)
+def outside(p,boot):
+    p = np.array(p,dtype=float)
+    p[2] = abs(p[2])
+    lo, hi = boot["ci"]
+    return [i for i in range(len(p)) if not lo[i] <= p[i] <= hi[i]]
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='check_bootstrap',\
+        description='Check that the point estimates of the peak fits lie '
+                    'inside their bootstrap confidence intervals, on '
+                    'synthetic peaks')
+
+parser.add_argument('-s','--seeds',
+        type=int, default=3,
+        help='number of synthetic peaks')
+
+parser.add_argument('-n','--n_boot',
+        type=int, default=200,
+        help='resamples per fit')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    failed = 0
+    print(f"{'seed':>4}  {'model':<10}{'n':>5}  outside the CI")
+    for seed in range(args.seeds):
+        x, y = synthetic_peak(seed)
+        for shape, (fct, fit) in FITS.items():
+            p = fit(x,y)
+            boot = bootstrap(shape,x,y,p,args.n_boot,seed=seed)
+            _out = outside(p,boot)
+            print(f"{seed:>4d}  {shape:<10}{boot['n']:>5d}  "
+                  f"{_out if _out else '-'}")
+            if _out:
+                failed += 1
+
+    if failed:
+        print(f"Warning. {failed} fit(s) outside of their own CI.")
+        sys.exit(1)
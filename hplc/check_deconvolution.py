@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import numpy as np
+from chromatogram.deconvolution import INJECTION, deconvolve
+from chromatogram.synthetic import NOISE, chromato
+
+#GLOBAL CONSTANTS
+#Two co-eluting peaks (area, loc, scale, alpha) 2.25 sigma apart - one
+#maximum and a shoulder, as the isomers of C90-a - and an injection artefact
+PAIR = [
+        [4.0, 10.0, 0.2, 0.0],
+        [2.0, 10.45, 0.2, 0.0]
+        ]
+ARTEFACT = [0.3, 0.2, 0.05, 0.0]
+#Detector spike narrower than the sampling step - its width and area are not
+#resolved, only its position
+SPIKE = [0.05, 15.0, 0.006, 0.0]
+#Run length (min) and sampling of the data_Steven runs (1 point/s)
+DURATION = 20
+N_POINTS = 1200
+#Largest error on the retention times (min) and relative error on the areas
+TR_TOL = 0.05
+AREA_TOL = 0.15
+
+#FUNCTIONS
+#Noisy pair of peaks, spike and injection artefact of the given seed
+def synthetic_pair(seed,noise=NOISE):
+    _rng = np.random.default_rng(seed)
+    x = np.linspace(0,DURATION,N_POINTS,endpoint=False)
+    y = chromato(x,PAIR+[SPIKE,ARTEFACT])
+    return [x,y+_rng.normal(0,noise,N_POINTS)]
+
+#Problems of a deconvolution of the pair and the spike
+def check_pair(x,params,peaks):
+    problems = []
+    if len(peaks) != len(PAIR)+1:
+        _tr = ", ".join(f"{peak['tR']:0.3f}" for peak in peaks)
+        return [f"{len(peaks)} peaks at {_tr}"]
+    for peak, true in zip(peaks,PAIR+[SPIKE]):
+        if abs(peak["tR"]-true[1]) > TR_TOL:
+            problems.append(f"tR {peak['tR']:0.3f} for {true[1]}")
+        if true is SPIKE:
+            continue
+        if abs(peak["area"]-true[0]) > AREA_TOL*true[0]:
+            problems.append(f"area {peak['area']:0.3f} for {true[0]}")
+    if np.any(params[:,1] < x[0]) or np.any(params[:,1] > x[-1]):
+        problems.append("centre outside of the data")
+    return problems
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='check_deconvolution',\
+        description='Check that the deconvolution resolves two co-eluting '
+                    'peaks and a spike narrower than the sampling step of a '
+                    'synthetic trace, with and without the number of peaks, '
+                    'and seeds nothing in the injection region')
+
+parser.add_argument('-s','--seeds',
+        type=int, default=3,
+        help='number of synthetic traces')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    failed = 0
+    print(f"{'seed':>4}  {'shape':<10}{'k':>5}  problems")
+    for seed in range(args.seeds):
+        x, y = synthetic_pair(seed)
+        for shape in ["gauss","skew_norm"]:
+            for k in [None,len(PAIR)+1]:
+                params, peaks, _res = deconvolve(x,y,k,shape,t_min=INJECTION)
+                _problems = check_pair(x,params,peaks)
+                print(f"{seed:>4d}  {shape:<10}{str(k):>5}  "
+                      f"{'; '.join(_problems) if _problems else '-'}")
+                if _problems:
+                    failed += 1
+
+    if failed:
+        print(f"Warning. {failed} deconvolution(s) off. Exit.")
+        sys.exit(1)
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import numpy as np
+from chromatogram import (process_file, BaselineCache, gauss, skew_norm,
+                          gauss_jac, skew_norm_jac, lsq_gauss_fit,
+                          lsq_skew_norm_fit)
+
+#GLOBAL CONSTANTS
+#Largest accepted relative error of the analytic Jacobians
+# (central differences are only good to ~1e-5 on the sharpest peaks)
+JAC_TOL = 1e-4
+
+#FUNCTIONS
+#Central finite differences of fct(x,p) with respect to p
+def fd_jac(fct,x,p,h=1e-6):
+    p = np.asarray(p,dtype=float)
+    cols = []
+    for i in range(len(p)):
+        dp = np.zeros(len(p))
+        dp[i] = h*max(1.0,abs(p[i]))
+        cols.append((fct(x,p+dp)-fct(x,p-dp))/(2*dp[i]))
+    return np.column_stack(cols)
+
+def jac_error(fct,jac,x,p):
+    _fd = fd_jac(fct,x,p)
+    return np.abs(jac(x,p)-_fd).max()/np.abs(_fd).max()
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='check_jacobian',\
+        description='Compare the analytic and finite difference Jacobians '
+                    'of the peak fits on baseline corrected chromatograms')
+
+#Files are required
+parser.add_argument("filename",
+        nargs='+',
+        help="the .txt data files")
+
+#Parse arguments
+args = parser.parse_args()
+cache = BaselineCache()
+
+failed = 0
+print(f"{'file':<40}{'model':<12}{'nfev fd':>8}{'nfev an':>8}"
+      f"{'max|dp|':>12}{'jac err':>12}")
+for path in args.filename:
+    res = process_file(path,fit=False,adaptive=True,cache=cache)
+    x_fit, y_fit = res.window()
+    for label, fct, jac, fit in [("Gaussian",gauss,gauss_jac,lsq_gauss_fit),
+            ("Skew-Normal",skew_norm,skew_norm_jac,lsq_skew_norm_fit)]:
+        fd = fit(x_fit,y_fit,"2-point",full_output=True)
+        an = fit(x_fit,y_fit,"analytic",full_output=True)
+        err = max(jac_error(fct,jac,x_fit,fd.x),jac_error(fct,jac,x_fit,an.x))
+        # nfev of the finite difference fit excludes the Jacobian calls
+        nfev_fd = fd.nfev + fd.njev*len(fd.x)
+        print(f"{res.name[:38]:<40}{label:<12}{nfev_fd:>8d}{an.nfev:>8d}"
+              f"{np.abs(an.x-fd.x).max():>12.3e}{err:>12.3e}")
+        if err > JAC_TOL:
+            failed += 1
+
+if failed:
+    print(f"Warning. {failed} Jacobian(s) off by more than {JAC_TOL}.")
+    sys.exit(1)
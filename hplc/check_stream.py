@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+import sys
+import argparse
+import numpy as np
+from chromatogram.fitting import skew_norm
+from chromatogram.stream import StreamProcessor
+from chromatogram.synthetic import DURATION, PEAKS, synthetic_chromatogram
+
+#GLOBAL CONSTANTS
+#Default synthetic peaks, after a broad hump at the start of the run as the
+#injection disturbance of the data_Steven runs (C70: 2 min, sigma 1 min)
+HUMP = [1.0, 2.0, 1.0, 0.0]
+#Sampling of the data_Steven runs (1 point/s) and samples per update
+N_POINTS = 60*DURATION
+CHUNK = 10
+
+#FUNCTIONS
+#Apex and standard deviation of a skew-normal peak
+def apex_std(peak):
+    _x = np.linspace(peak[1]-5*peak[2],peak[1]+5*peak[2],10001)
+    _delta = peak[3]/np.sqrt(1+peak[3]**2)
+    return [_x[np.argmax(skew_norm(_x,peak))],
+            peak[2]*np.sqrt(1-2*_delta**2/np.pi)]
+
+#Problems of the preliminary fits of the emitted peaks - a fit is either
+#NaN or centred within one standard deviation of the apex of its peak, with
+#a width under twice it (the baseline correction takes the wings of the
+#hump, so its fits are narrower)
+def check_fits(emitted,peaks):
+    problems = []
+    _true = [apex_std(peak) for peak in peaks]
+    for peak in emitted:
+        _apex, _std = min(_true,key=lambda t: abs(t[0]-peak["tR"]))
+        if np.isnan(peak["x0"]):
+            continue
+        if (abs(peak["x0"]-_apex) > _std
+                or not 0 < peak["sigma"] <= 2*_std):
+            problems.append(f"peak at {peak['tR']:0.3f}: x0 "
+                            f"{peak['x0']:0.3f}, sigma {peak['sigma']:0.3f} "
+                            f"for {_apex:0.3f}, {_std:0.3f}")
+    return problems
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='check_stream',\
+        description='Check the preliminary Gaussian fits of the peaks '
+                    'emitted by the streaming processor, on synthetic runs')
+
+parser.add_argument('-s','--seeds',
+        type=int, default=3,
+        help='number of synthetic runs')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    failed = 0
+    peaks = [HUMP]+PEAKS
+    for seed in range(args.seeds):
+        x, y, truth = synthetic_chromatogram(N_POINTS,peaks,seed=seed)
+        stream = StreamProcessor()
+        emitted = []
+        for i in range(0,len(x),CHUNK):
+            emitted += stream.update(x[i:i+CHUNK],y[i:i+CHUNK])
+        _problems = check_fits(emitted,peaks)
+        _fits = ", ".join(f"{p['x0']:0.3f}/{p['sigma']:0.3f}" for p in emitted)
+        print(f"{seed:>4d}  {len(emitted):d} peaks (x0/sigma {_fits})")
+        for problem in _problems:
+            print(f"      {problem}")
+        if _problems:
+            failed += 1
+
+    if failed:
+        print(f"Warning. {failed} run(s) with unreliable fits. Exit.")
+        sys.exit(1)
@@ -0,0 +1,36 @@
+"""
+Assisted BEADS baseline correction and peak fitting of HPLC chromatograms.
+
+The functions only depend on their arguments, so the chromatograms can be
+processed in-process from a notebook or a batch driver. hplc_extract.py and
+hplc_batch.py are the command line wrappers.
+
+    import chromatogram
+    res = chromatogram.process_file("data_Steven/C60__HPLC.txt",adaptive=True)
+    res.cutoff, res.p_gauss, res.p_skew_norm
+"""
+
+from .preprocess import pre_process_signal, log_transform
+from .reader import read_chromatogram
+from .decimation import peak_fwhm, decimation_factor
+from .baseline import (ADAPTIVE_TOL, DECIMATE_TOL, CutoffScan, r2_fct,
+                       r2_beads, r2_scan, r2_adaptive, fcutoff_beads,
+                       dense_cutoff, beads)
+from .fitting import (gauss, skew_norm, gauss_jac, skew_norm_jac,
+                      peaks_params, lsq_gauss_fit, lsq_skew_norm_fit)
+from .deconvolution import seed_peaks, multi_model, deconvolve
+from .cache import BaselineCache
+from .alignment import (common_grid, resample, xcorr_shift, align_stack,
+                        load_stack)
+from .library import LibraryIndex, run_features
+from .calibration import ColumnCalibration, is_marker, detect_t0
+from .profiling import StageProfiler, profile_stage, write_profile
+from .stream import StreamProcessor, tail_vernier, replay_vernier
+from .synthetic import (synthetic_chromatogram, write_vernier,
+                        write_synthetic)
+from .replicate import (REPLICATE_R2_TOL, group_replicates,
+                        process_replicates, reproducibility_rows)
+from .bootstrap import bootstrap
+from .result import (header1, header2, header4, header9, ChromatogramResult,
+                     process_chromatogram, process_file, file_labels,
+                     stats_rows)
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+import json
+import numpy as np
+from scipy import fft
+
+#GLOBAL CONSTANTS
+META_EXT = ".json"
+
+#FUNCTIONS
+#Shared time grid of several runs - their union, at the finest sampling step
+# Returns [start, step, number of points].
+def common_grid(xs,dx=None):
+    if dx is None:
+        dx = min(np.median(np.diff(x)) for x in xs)
+    start = min(x[0] for x in xs)
+    stop = max(x[-1] for x in xs)
+    return [float(start),float(dx),int(np.floor((stop-start)/dx+1E-9))+1]
+
+def grid_points(grid):
+    start, dx, n = grid
+    return start + dx*np.arange(n)
+
+#Trace on the grid, 0 outside of the run
+def resample(x,y,grid):
+    return np.interp(grid_points(grid),x,y,left=0.0,right=0.0)
+
+#Trace scaled for the correlation - zero mean and unit norm inside the
+#window [i0,i1) of the grid, 0 outside
+def _normalise(y,i0,i1):
+    _y = np.zeros(len(y))
+    _y[i0:i1] = y[i0:i1]-y[i0:i1].mean()
+    _norm = np.linalg.norm(_y)
+    if _norm > 0:
+        _y /= _norm
+    return _y
+
+#Spectrum of a normalised trace, zero-padded against the circular wrap
+def spectrum(y,i0=0,i1=None):
+    _n = fft.next_fast_len(2*len(y),real=True)
+    return fft.rfft(_normalise(y,i0,len(y) if i1 is None else i1),_n)
+
+#Shift (samples, fractional) of a trace against a reference spectrum
+# A positive shift means the trace elutes later than the reference. The
+# cross-correlation is one product of spectra, O(n log n), and its peak is
+# refined by a parabola through the 3 points around the maximum.
+def xcorr_shift(ref_spec,y,i0=0,i1=None,max_shift=None):
+    _n = fft.next_fast_len(2*len(y),real=True)
+    _y = _normalise(y,i0,len(y) if i1 is None else i1)
+    if not _y.any():
+        #flat or no data in the window
+        return [0.0,0.0]
+    _c = fft.irfft(fft.rfft(_y,_n)*np.conj(ref_spec),_n)
+    #lags -m..m, the negative ones are at the end of the circular result
+    _m = len(y)-1 if max_shift is None else min(int(max_shift),len(y)-1)
+    _c = np.concatenate((_c[-_m:],_c[:_m+1])) if _m > 0 else _c[:1]
+    k = int(np.argmax(_c))
+    shift = float(k-_m)
+    if 0 < k < len(_c)-1:
+        _den = _c[k-1]-2*_c[k]+_c[k+1]
+        if _den < 0:
+            shift += 0.5*(_c[k-1]-_c[k+1])/_den
+    return [shift,float(_c[k])]
+
+#Trace moved back by shift samples (linear interpolation, 0 outside)
+def shift_trace(y,shift):
+    _i = np.arange(len(y))
+    return np.interp(_i+shift,_i,y,left=0.0,right=0.0)
+
+#Align the rows of a stacked matrix on one of them, in place
+# window: [xmin,xmax] (min) of the grid used for the correlation, e.g. a
+# peak common to all the runs; max_shift in min. Returns the shifts (min)
+# and the correlation peaks.
+def align_stack(stack,grid,reference=0,window=None,max_shift=None):
+    start, dx, n = grid
+    i0, i1 = 0, n
+    if window is not None:
+        i0 = int(np.clip(np.ceil((window[0]-start)/dx),0,n))
+        i1 = int(np.clip(np.floor((window[1]-start)/dx)+1,i0,n))
+    _max = None if max_shift is None else max_shift/dx
+    ref_spec = spectrum(np.asarray(stack[reference]),i0,i1)
+    shifts = np.zeros(len(stack))
+    corr = np.ones(len(stack))
+    for i in range(len(stack)):
+        if i == reference:
+            continue
+        _y = np.asarray(stack[i])
+        _shift, corr[i] = xcorr_shift(ref_spec,_y,i0,i1,_max)
+        stack[i] = shift_trace(_y,_shift)
+        shifts[i] = _shift*dx
+    return [shifts,corr]
+
+#Memory-mapped .npy matrix of the runs (one row each) on the grid, and its
+#metadata (grid, names, shifts) in path+META_EXT
+def open_stack(path,n_runs,grid):
+    return np.lib.format.open_memmap(path,mode="w+",dtype=np.float64,
+                                     shape=(n_runs,grid[2]))
+
+def write_stack_meta(path,grid,names,shifts=None,corr=None,reference=None):
+    meta = {
+            "grid": grid,
+            "names": list(names),
+            "reference": reference,
+            "shifts": None if shifts is None else list(map(float,shifts)),
+            "corr": None if corr is None else list(map(float,corr))
+            }
+    with open(path+META_EXT,"w") as f:
+        json.dump(meta,f,indent=1)
+    return meta
+
+#Stacked matrix (read-only memory map) and its metadata
+def load_stack(path):
+    with open(path+META_EXT) as f:
+        meta = json.load(f)
+    return [np.load(path,mmap_mode="r"),meta]
@@ -0,0 +1,23 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import contextlib
+
+#FUNCTIONS
+#Open a temporary file in the directory of path and rename it over path when
+#the block exits cleanly - a baseline entry, calibration, library index or
+#trace sidecar is either the previous file or the new one, even if another
+#hplc_batch worker reads it meanwhile or the run is interrupted
+@contextlib.contextmanager
+def atomic_write(path,mode="wb"):
+    _dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(_dir,exist_ok=True)
+    _fd, _tmp = tempfile.mkstemp(dir=_dir,suffix=".tmp")
+    try:
+        with os.fdopen(_fd,mode) as f:
+            yield f
+        os.replace(_tmp,path)
+    except BaseException:
+        os.remove(_tmp)
+        raise
@@ -0,0 +1,312 @@
+#!/usr/bin/python3
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pybaselines import Baseline
+from scipy.signal import argrelmin, argrelmax
+from scipy.ndimage import gaussian_filter1d
+from .preprocess import log_transform
+from .decimation import decimation_factor, decimate_signal
+from .profiling import profile_stage, add_calls
+
+#GLOBAL CONSTANTS
+#BEADS working parameters
+ASYMMETRY = 1.0
+FIT_PARABOLA = True
+HALF_WINDOW = None
+
+#Geometric grid of the cutoff scan
+F_CUT_MIN = 0.00001
+F_CUT_MAX = 0.5
+F_CUT_NUM = 1000
+
+#Relative tolerance of the adaptive cutoff against the dense scan
+# (about two steps of the 1000-point geometric grid)
+ADAPTIVE_TOL = 0.025
+
+#Candidate baselines of the scan scored together
+SCAN_BLOCK = 32
+
+#Largest change of the baseline, relative to the height of the corrected
+# signal, when the cutoff is scanned on the decimated signal (at most 0.030
+# on the data_Steven chromatograms with the automatic factor)
+DECIMATE_TOL = 0.04
+
+class CutoffScan(object):
+    """
+    Object which will contain the autocorrelation scan over the BEADS
+    cutoff frequencies and the cutoff selected from it.
+    """
+
+    def __init__(self,f_cuts,r2_val,known,r2_cut,elapsed):
+
+        self.f_cuts = f_cuts
+        self.r2_val = r2_val
+        self.known = known
+        smooth, smooth_d1, smooth_d2, infls = r2_inflections(r2_val)
+        self.smooth = smooth
+        self.smooth_d1 = smooth_d1
+        self.smooth_d2 = smooth_d2
+        self.infls = infls
+        self.cutoff = select_cutoff(f_cuts,smooth_d1,infls)[0]
+        self.r2_cut = r2_cut
+        self.elapsed = elapsed
+        self.decimate = 1
+        self.cached = False
+
+
+    @property
+    def n_solves(self):
+        return np.count_nonzero(self.known)
+
+
+    @property
+    def r2_ymin(self):
+        """
+        Lower limit of the r2 plot.
+        """
+        d1_min = np.argmin(self.smooth_d1[self.infls])
+        return self.r2_val[self.infls[d1_min-1]]-0.05
+
+
+    @property
+    def rel_min_d1(self):
+        return argrelmin(self.smooth_d1)[0]
+
+
+    @property
+    def rel_max_d1(self):
+        return argrelmax(self.smooth_d1)[0]
+
+###############################################################################
+#FUNCTIONS
+#Durbin-Watson statistic, as statsmodels.stats.stattools.durbin_watson
+# One value per row of a 2-D stack of residuals
+def dwtest(e):
+    return np.sum(np.diff(e,axis=-1)**2,axis=-1)/np.sum(e**2,axis=-1)
+
+#Autocorrelation
+# The square is taken value by value: numpy squares arrays and scalars
+# differently in the last bit, and the scan must not depend on the blocks.
+def r2_fct(s):
+    _dw = dwtest(s)
+    if np.ndim(_dw) == 0:
+        return ((2-_dw)**2)/4
+    return np.array([((2-dw)**2)/4 for dw in _dw])
+
+#BEADS baseline at one cutoff with the working parameters
+def beads_baseline(f_cut,s,fitter):
+    _bl, _p = fitter.beads(
+            s,
+            freq_cutoff=f_cut,
+            fit_parabola=FIT_PARABOLA,
+            asymmetry=ASYMMETRY,
+            smooth_half_window=HALF_WINDOW
+            )
+    return _bl
+
+#Basic BEADS for the autocorrelation plot
+def r2_beads(f_cut,s,fitter):
+    _s_corr = s - beads_baseline(f_cut,s,fitter)
+    _r2 = r2_fct(_s_corr)
+    return _r2
+
+#Chunk of the cutoff scan - one Baseline object per worker
+# The candidate baselines are stacked by blocks of SCAN_BLOCK cutoffs and
+# their residuals scored in one reduction.
+def r2_beads_chunk(f_cuts,x,s,block=SCAN_BLOCK):
+    _fitter = Baseline(x_data=x)
+    r2_val = np.empty(len(f_cuts))
+    _bl = np.empty((min(block,len(f_cuts)),len(s)))
+    for i in range(0,len(f_cuts),block):
+        _f_block = f_cuts[i:i+block]
+        for j, f_cut in enumerate(_f_block):
+            _bl[j] = beads_baseline(f_cut,s,_fitter)
+        r2_val[i:i+len(_f_block)] = r2_fct(s-_bl[:len(_f_block)])
+    return r2_val
+
+#Autocorrelation for every cutoff frequency, over n_jobs processes
+def r2_scan(f_cuts,x,s,n_jobs=1):
+    if n_jobs <= 1:
+        return r2_beads_chunk(f_cuts,x,s)
+    # Interleaved chunks balance the cost of the slow and fast cutoffs.
+    _chunks = [f_cuts[i::n_jobs] for i in range(n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        _res = list(pool.map(r2_beads_chunk,_chunks,
+                             [x]*n_jobs,[s]*n_jobs))
+    r2_val = np.empty(len(f_cuts))
+    for i, _r2 in enumerate(_res):
+        r2_val[i::n_jobs] = _r2
+    return r2_val
+
+#Smoothed autocorrelation curve, its derivatives and inflection points
+def r2_inflections(r2_val):
+    smooth = gaussian_filter1d(r2_val,25)
+    smooth_d1 = np.gradient(smooth)
+    smooth_d2 = np.gradient(np.gradient(smooth))
+    infls = np.where(np.diff(np.sign(smooth_d2)))[0]
+    return [smooth,smooth_d1,smooth_d2,infls]
+
+#Cutoff frequency from the inflection points - also returns the indices used
+def select_cutoff(f_cuts,smooth_d1,infls):
+    # How do we find the right inflection point?
+    d1_min = np.argmin(smooth_d1[infls])
+    if d1_min == 0:
+        if len(infls) == 2:
+            used = [infls[d1_min]]
+            infl_plateau = f_cuts[infls[d1_min]]
+            _freq_cutoff = 0.10*infl_plateau    #0.25
+        else:
+            used = [infls[d1_min+1]]
+            infl_plateau = f_cuts[infls[d1_min+1]]
+            _freq_cutoff = 0.75*infl_plateau
+    else:
+        thresh_d1 = smooth_d1[infls[d1_min-1]]
+        if ((thresh_d1 < -4E-04) and (d1_min > 2)):
+            used = [infls[d1_min-3],infls[d1_min-2]]
+            shift_factor = 0.20#0.1/np.log(len(s))*np.log(20)
+        else:
+            used = [infls[d1_min-1],infls[d1_min]]
+            shift_factor = 0.05#0.1/np.log(len(s))*np.log(20)
+        infl_plateau = f_cuts[used[0]]
+        infl_min = f_cuts[used[1]]
+        infl_shift = shift_factor*(infl_min-infl_plateau)
+        _freq_cutoff = infl_plateau + infl_shift #1.50*infl_plateau
+    return [_freq_cutoff,used]
+
+#Coarse-to-fine cutoff scan
+# BEADS is solved on every step-th cutoff, the r2 curve is interpolated on
+# the log-grid, then refined only around the inflection points used by
+# select_cutoff until they stop moving. If they still move after n_iter
+# refinements, every cutoff around them is solved, so that the curve
+# returned is only interpolated between solved points.
+def r2_adaptive(f_cuts,x,s,n_jobs=1,step=20,width=20,stride=4,n_iter=5):
+    _n = len(f_cuts)
+    _i = np.arange(_n)
+    known = np.zeros(_n,dtype=bool)
+    r2_known = np.zeros(_n)
+    todo = np.zeros(_n,dtype=bool)
+    todo[::step] = True
+    todo[-1] = True
+    for it in range(n_iter+1):
+        r2_known[todo] = r2_scan(f_cuts[todo],x,s,n_jobs)
+        known |= todo
+        r2_val = np.interp(_i,_i[known],r2_known[known])
+        smooth, smooth_d1, smooth_d2, infls = r2_inflections(r2_val)
+        _fcut, used = select_cutoff(f_cuts,smooth_d1,infls)
+        #dense around the inflection points once the budget is spent
+        _stride = stride if it < n_iter-1 else 1
+        todo = np.zeros(_n,dtype=bool)
+        for u in used:
+            todo[max(u-width,0):u+width+1:_stride] = True
+        todo &= ~known
+        if not todo.any() or it == n_iter:
+            break
+    return [r2_val,known]
+
+#Cutoff frequencies explored by the scan
+def cutoff_range():
+    return np.geomspace(F_CUT_MIN, F_CUT_MAX, num=F_CUT_NUM, endpoint=False)
+
+#Frequency cutoff for BEADS
+# With decimate = d > 1 the scan runs on every d-th sample and its cutoffs,
+# in cycles per sample, are divided by d for the full signal.
+def fcutoff_beads(x,s,n_jobs=1,adaptive=False,decimate=1):
+    tic = time.perf_counter()
+
+    # log transform of the signal
+    _z = log_transform(s,1)
+    _x_scan, _s_scan = decimate_signal(x,s,decimate)
+    _z_scan = log_transform(_s_scan,1)
+
+    _freq_cutoff_range = cutoff_range()
+
+    if adaptive:
+        r2_val, known = r2_adaptive(_freq_cutoff_range,_x_scan,_z_scan,n_jobs)
+    else:
+        r2_val = r2_scan(_freq_cutoff_range,_x_scan,_z_scan,n_jobs)   # y-data
+        known = np.ones(len(r2_val),dtype=bool)
+    toc = time.perf_counter()
+
+    scan = CutoffScan(_freq_cutoff_range/decimate,r2_val,known,None,toc-tic)
+    scan.decimate = decimate
+    scan.r2_cut = r2_beads(scan.cutoff,_z,Baseline(x_data=x))
+    return scan
+
+#Cutoff of the dense scan - reference for the adaptive one
+def dense_cutoff(x,s,n_jobs=1):
+    return fcutoff_beads(x,s,n_jobs).cutoff
+
+###############################################################################
+#Everything the baseline depends on, besides the data - the cache key
+def beads_params(f_cut=None,adaptive=False,decimate=1):
+    return {
+            "f_cut": f_cut,
+            "adaptive": bool(adaptive),
+            "decimate": int(decimate),
+            "asymmetry": ASYMMETRY,
+            "fit_parabola": FIT_PARABOLA,
+            "half_window": HALF_WINDOW,
+            "grid": [F_CUT_MIN,F_CUT_MAX,F_CUT_NUM]
+            }
+
+#Baseline and cutoff scan rebuilt from a cache entry
+def _from_cache(entry):
+    if "r2_val" in entry:
+        _decimate = int(entry["decimate"])
+        scan = CutoffScan(cutoff_range()/_decimate,entry["r2_val"],
+                          entry["known"],float(entry["r2_cut"]),
+                          float(entry["elapsed"]))
+        scan.decimate = _decimate
+        scan.cached = True
+    else:
+        scan = None
+    return [entry["baseline"],None,scan]
+
+#BEADS baseline correction
+# decimate: scan the cutoff on every decimate-th sample, 0 to size it from
+# the narrowest peak - the baseline itself is always solved on the full signal
+def beads(x,s,f_cut=None,n_jobs=1,adaptive=False,cache=None,decimate=1):
+    # Read Navarro-Huerta et al (2017)
+    # Section 3.2: Monitoring the autocorrelation to explore the BEADS
+    #              working parameters
+    # 3.3.2. Chromatograms involving peaks with extremely different magnitude
+    # Section 3.4: Autocorrelation plot using the baseline-corrected signal
+    # Section 3.5: Application of the assisted BEADS
+    if f_cut is not None:
+        decimate = 1
+    elif decimate == 0:
+        decimate = decimation_factor(s)
+
+    if cache is not None:
+        _key = cache.key(x,s,beads_params(f_cut,adaptive,decimate))
+        _entry = cache.load(_key)
+        if _entry is not None:
+            return _from_cache(_entry)
+
+    if f_cut is None:
+        with profile_stage("cutoff_scan",calls=0):
+            scan = fcutoff_beads(x,s,n_jobs,adaptive,decimate)#0.005*2000/len(s)
+        # calls of the scan are its BEADS solves, with the one at the cutoff
+        add_calls("cutoff_scan",scan.n_solves+1)
+        f_cut = scan.cutoff
+    else:
+        scan = None
+
+    _bl, _p = Baseline(x_data=x).beads(
+            s,
+            freq_cutoff=f_cut,
+            fit_parabola=FIT_PARABOLA,
+            asymmetry=ASYMMETRY,
+            smooth_half_window=HALF_WINDOW
+            )
+
+    if cache is not None:
+        if scan is None:
+            cache.store(_key,baseline=_bl)
+        else:
+            cache.store(_key,baseline=_bl,r2_val=scan.r2_val,
+                        known=scan.known,r2_cut=scan.r2_cut,
+                        elapsed=scan.elapsed,decimate=scan.decimate)
+    return [_bl,_p,scan]
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .fitting import gauss, skew_norm, lsq_gauss_fit, lsq_skew_norm_fit
+
+#GLOBAL CONSTANTS
+N_BOOT = 1000
+CONFIDENCE = 0.95
+#Model and fit of each distribution
+FITS = {
+        "gauss": [gauss, lsq_gauss_fit],
+        "skew_norm": [skew_norm, lsq_skew_norm_fit]
+        }
+
+#FUNCTIONS
+#Fits of n residual resamples - one row of parameters each, nan if a fit
+#failed
+# The resampled data are the point fit plus its residuals, centred on their
+# median (the soft_l1 loss fits the median of the residuals, not their mean),
+# drawn with replacement. Each resample is fitted as the point fit was: same
+# estimator, same start from the detected peak and same bounds, so that the
+# resamples are not biased towards the point fit.
+def resample_fits(shape,x,y,p,n,seed,jac="2-point"):
+    fct, fit = FITS[shape]
+    _rng = np.random.default_rng(seed)
+    _model = fct(x,p)
+    _res = y-_model
+    _res -= np.median(_res)
+    samples = np.full((n,len(p)),np.nan)
+    for i in range(n):
+        _y = _model + _res[_rng.integers(0,len(x),len(x))]
+        try:
+            samples[i] = fit(x,_y,jac)
+        except (ValueError, IndexError):
+            pass
+    return samples
+
+#Residual bootstrap of a fit, over n_jobs processes
+# Returns a dict with the samples, standard errors and the confidence
+# interval [lo, hi] of each parameter (sigma/scale as its absolute value).
+# The resamples are drawn from independent streams spawned from seed, so the
+# result only depends on seed and n_jobs.
+def bootstrap(shape,x,y,p,n=N_BOOT,n_jobs=1,seed=0,jac="2-point",
+              confidence=CONFIDENCE):
+    n_jobs = max(1,min(n_jobs,n))
+    _seeds = np.random.SeedSequence(seed).spawn(n_jobs)
+    _sizes = [len(c) for c in np.array_split(np.arange(n),n_jobs)]
+    if n_jobs == 1:
+        _res = [resample_fits(shape,x,y,p,n,_seeds[0],jac)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            _res = list(pool.map(resample_fits,[shape]*n_jobs,[x]*n_jobs,
+                                 [y]*n_jobs,[p]*n_jobs,_sizes,_seeds,
+                                 [jac]*n_jobs))
+    samples = np.vstack(_res)
+    samples = samples[np.all(np.isfinite(samples),axis=1)]
+    samples[:,2] = np.abs(samples[:,2])
+    _q = 50*(1-confidence)
+    return {
+            "samples": samples,
+            "n": len(samples),
+            "se": samples.std(axis=0,ddof=1),
+            "ci": np.percentile(samples,[_q,100-_q],axis=0),
+            "confidence": confidence
+            }
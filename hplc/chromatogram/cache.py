@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+import os
+import json
+import hashlib
+import numpy as np
+import pybaselines
+from .atomic import atomic_write
+
+#GLOBAL CONSTANTS
+#Bump when the stored arrays or the cutoff selection change
+CACHE_VERSION = 2
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"),".cache","hplc_extract")
+DEFAULT_MAX_SIZE = 512*1024**2   #bytes
+
+class BaselineCache(object):
+    """
+    Content-addressed on-disk cache of the BEADS cutoff scan and baseline.
+
+    Entries are compressed .npz files named after the SHA-256 of the data,
+    of the BEADS parameters and of the library versions. The least recently
+    used entries are removed once the directory exceeds max_size bytes.
+    """
+
+    def __init__(self,cache_dir=None,max_size=DEFAULT_MAX_SIZE):
+
+        if cache_dir is None:
+            cache_dir = os.environ.get("HPLC_CACHE_DIR",DEFAULT_DIR)
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+
+    def key(self,x,s,params):
+        """
+        Hash of the x and signal arrays, of the parameters (dict) and of the
+        numpy and pybaselines versions.
+        """
+        _h = hashlib.sha256()
+        for arr in (x,s):
+            arr = np.ascontiguousarray(arr,dtype=np.float64)
+            _h.update(arr.tobytes())
+        _meta = dict(params,
+                     cache_version=CACHE_VERSION,
+                     numpy=np.__version__,
+                     pybaselines=pybaselines.__version__)
+        _h.update(json.dumps(_meta,sort_keys=True,default=str).encode())
+        return _h.hexdigest()
+
+
+    def path(self,key):
+        return os.path.join(self.cache_dir,key+".npz")
+
+
+    def load(self,key):
+        """
+        Stored arrays as a dict, or None on a miss. A hit refreshes the
+        entry for the LRU eviction.
+        """
+        _path = self.path(key)
+        try:
+            with np.load(_path) as data:
+                entry = {k: data[k] for k in data.files}
+        except (OSError, ValueError, EOFError):
+            return None
+        os.utime(_path)
+        return entry
+
+
+    def store(self,key,**arrays):
+        # Atomic replace - several batch workers may share the directory.
+        with atomic_write(self.path(key)) as f:
+            np.savez_compressed(f,**arrays)
+        self.evict()
+
+
+    def entries(self):
+        _entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                _stat = entry.stat()
+                _entries.append([_stat.st_mtime,_stat.st_size,entry.path])
+        return _entries
+
+
+    def size(self):
+        return sum(e[1] for e in self.entries())
+
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in
+        max_size bytes.
+        """
+        _entries = sorted(self.entries())
+        _total = sum(e[1] for e in _entries)
+        for mtime, size, path in _entries:
+            if _total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _total -= size
+
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            os.remove(path)
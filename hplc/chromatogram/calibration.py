@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+import os
+import re
+import json
+import numpy as np
+from scipy.signal import find_peaks, peak_widths
+from scipy.ndimage import gaussian_filter1d
+from .cache import DEFAULT_DIR
+from .atomic import atomic_write
+
+#GLOBAL CONSTANTS
+#Unretained markers, as written in the run titles
+MARKERS = ["PENTANE"]
+#Height and prominence of the t0 peak, in robust standard deviations of the
+#noise (the first peak of the n-Pentane runs is at 5 to 15)
+T0_SNR = 5
+#Geometry of the LG-PYE column (mm)
+COLUMN_DIAMETER = 10.0
+COLUMN_LENGTH = 250.0
+DEFAULT_PATH = os.path.join(DEFAULT_DIR,"columns.json")
+
+class ColumnCalibration(object):
+    """
+    Persistent per-column calibration: dead time of the unretained marker
+    runs, porosity and phase ratio F of the column.
+
+    The entries are stored in one JSON file (default: $HPLC_CALIBRATION or
+    ~/.cache/hplc_extract/columns.json), keyed by column name. Each marker
+    run is kept under "runs" and the column values are recomputed from all
+    of them when a run is added.
+    """
+
+    def __init__(self,path=None):
+
+        if path is None:
+            path = os.environ.get("HPLC_CALIBRATION",DEFAULT_PATH)
+        self.path = path
+
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+    def get(self,column):
+        """
+        Calibration of a column (dict), None if no marker run was stored.
+        """
+        return self.load().get(column)
+
+
+    def add_run(self,column,name,t0,dt0,flow_rate,diameter=COLUMN_DIAMETER,
+                length=COLUMN_LENGTH):
+        columns = self.load()
+        _runs = columns.get(column,{}).get("runs",{})
+        _runs[name] = {"t0": t0, "dt0": dt0, "flow_rate": flow_rate}
+        columns[column] = column_calibration(_runs,diameter,length)
+        self.store(columns)
+        return columns[column]
+
+
+    def store(self,columns):
+        with atomic_write(self.path,"w") as f:
+            json.dump(columns,f,indent=1)
+
+###############################################################################
+#FUNCTIONS
+#Run of an unretained marker, from its title
+def is_marker(meta):
+    _title = (meta.get("title") or "").upper()
+    return any(marker in _title for marker in MARKERS)
+
+#Column of a run, from its title ("LG-PYE pass" reads as LG-PYE) - None if
+#not found
+def column_name(meta):
+    _m = re.search(r"([A-Za-z0-9-]*PYE)\b",meta.get("title") or "")
+    if _m is None:
+        return None
+    return _m.group(1)
+
+#Dead time of a marker run - apex and standard deviation (min) of the first
+#positive peak of the corrected signal
+def detect_t0(x,y,snr=T0_SNR):
+    _d = np.diff(y)
+    _noise = 1.4826*np.median(np.abs(_d-np.median(_d)))/np.sqrt(2)
+    _ys = gaussian_filter1d(y,2)
+    _i, _ = find_peaks(_ys,height=snr*_noise,prominence=snr*_noise)
+    if len(_i) == 0:
+        raise ValueError("no t0 peak above the noise")
+    _width = peak_widths(_ys,_i[:1],rel_height=0.5)[0][0]
+    _dx = (x[-1]-x[0])/(len(x)-1)
+    return [float(x[_i[0]]),float(_width*_dx/(2*np.sqrt(2*np.log(2))))]
+
+#Column values from the marker runs ({name: {t0, dt0, flow_rate}})
+# vm = t0*flow rate (uL), porosity = vm/(pi*(dc/2)**2*L), F = (1-e)/e
+# vm is the mean of the vm of the runs, which may have different flow rates,
+# and t0 the mean of their t0. Their uncertainties add in quadrature the
+# spread of the runs (standard deviation, 0 for a single run) and the width
+# of their t0 peaks (root mean square), so that a few close runs do not
+# give a t0 more precise than the peaks it is read from.
+def column_calibration(runs,diameter=COLUMN_DIAMETER,length=COLUMN_LENGTH):
+    _t0 = np.array([run["t0"] for run in runs.values()])
+    _dt0 = np.array([run["dt0"] for run in runs.values()])
+    _flow = np.array([run["flow_rate"] for run in runs.values()])
+    _vm = _t0*_flow*1000
+    _dvm = _dt0*_flow*1000
+    _ddof = 1 if len(runs) > 1 else 0
+    t0 = _t0.mean()
+    dt0 = np.sqrt(_t0.var(ddof=_ddof)+np.mean(_dt0**2))
+    vm = _vm.mean()
+    dvm = np.sqrt(_vm.var(ddof=_ddof)+np.mean(_dvm**2))
+    porosity = vm/(np.pi*(diameter/2)**2*length)
+    dporosity = porosity*dvm/vm
+    F = (1-porosity)/porosity
+    return {
+            "t0": float(t0),
+            "dt0": float(dt0),
+            "flow_rate": float(_flow.mean()),
+            "diameter": float(diameter),
+            "length": float(length),
+            "vm": float(vm),
+            "dvm": float(dvm),
+            "porosity": float(porosity),
+            "dporosity": float(dporosity),
+            "F": float(F),
+            "dF": float(dporosity/porosity**2),
+            "runs": runs
+            }
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+
+import numpy as np
+from scipy.signal import find_peaks, peak_widths
+
+#GLOBAL CONSTANTS
+#Prominence of the peaks sizing the decimation, relative to the signal range
+PEAK_PROM = 0.25
+#Samples kept over the half height of the narrowest peak after decimation
+MIN_PEAK_POINTS = 10
+#Samples kept for the cutoff scan
+MIN_SCAN_POINTS = 800
+MAX_DECIMATE = 4
+
+#FUNCTIONS
+#Widths at half height (samples) of the peaks above PEAK_PROM of the range
+def peak_fwhm(s):
+    _peaks, _ = find_peaks(s,prominence=PEAK_PROM*(s.max()-s.min()))
+    return peak_widths(s,_peaks,rel_height=0.5)[0]
+
+#Largest decimation factor keeping MIN_PEAK_POINTS samples over the half
+#height of the narrowest peak and MIN_SCAN_POINTS samples in total - 1 if
+#the signal has no clear peak
+def decimation_factor(s):
+    widths = peak_fwhm(s)
+    if len(widths) == 0:
+        return 1
+    _d = min(widths.min()//MIN_PEAK_POINTS,len(s)//MIN_SCAN_POINTS)
+    return int(np.clip(_d,1,MAX_DECIMATE))
+
+#Every d-th sample - BEADS cutoffs are in cycles per sample, so a cutoff
+#f found on the decimated signal is f/d on the full one
+def decimate_signal(x,s,d):
+    return [x[::d],s[::d]]
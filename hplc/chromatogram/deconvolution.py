@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.signal import find_peaks, peak_widths
+from scipy.ndimage import gaussian_filter1d
+from scipy.sparse import csr_matrix
+from .fitting import gauss, skew_norm, gauss_jac, skew_norm_jac
+
+#GLOBAL CONSTANTS
+#Model, Jacobian and number of parameters of each component shape
+SHAPES = {
+        "gauss": [gauss,gauss_jac,3],
+        "skew_norm": [skew_norm,skew_norm_jac,4]
+        }
+#Half width of the support of a component, in sigma
+SUPPORT = 8
+#FWHM/sigma of a Gaussian and of minus its second derivative
+FWHM_Y = 2*np.sqrt(2*np.log(2))
+FWHM_D2 = 1.26
+#Largest skewness allowed in the joint fit
+ALPHA_MAX = 20
+#End of the injection region (min) - the injection artefacts and the solvent
+#front elute before it, the retained peaks after t0 (about 3 min on the
+#LG-PYE column at 3 mL/min)
+INJECTION = 1.0
+#Negative curvature of a shoulder, in robust standard deviations of the
+#curvature noise
+D2_SNR = 3
+#Smallest seeded peak, in robust standard deviations of the noise (limit of
+#quantification), and largest number of components seeded when k is None
+LOQ = 10
+MAX_PEAKS = 20
+
+#FUNCTIONS
+#Samples of x within SUPPORT sigma of loc - x is sorted
+def _support(x,loc,scale):
+    _lo = np.searchsorted(x,loc-SUPPORT*scale)
+    _hi = np.searchsorted(x,loc+SUPPORT*scale)
+    return slice(_lo,_hi)
+
+#Smallest height of a seed after t_min - a fraction prominence of the
+#largest signal, and at least LOQ times the noise
+def min_height(x,y,prominence=0.05,t_min=INJECTION):
+    _d = np.diff(y)
+    _noise = 1.4826*np.median(np.abs(_d-np.median(_d)))/np.sqrt(2)
+    return max(prominence*y[x >= t_min].max(),LOQ*_noise)
+
+#Seeds (index, sigma) of the k largest peaks (the MAX_PEAKS largest if k is
+#None)
+# Maxima of the signal come first, then the maxima of its negative
+# curvature, which also resolve the shoulders of co-eluting peaks. A
+# shoulder is under the signal and concave (-y'' above the curvature
+# noise). Nothing is seeded before t_min (injection region, or t0). The
+# widths are at least one sample, the lower bound of the fit.
+def seed_peaks(x,y,k=None,prominence=0.05,t_min=INJECTION):
+    _dx = np.median(np.diff(x))
+    _k = MAX_PEAKS if k is None else k
+    _valid = x >= t_min
+    if not np.any(_valid):
+        return []
+    _ymin = min_height(x,y,prominence,t_min)
+    _peaks, _ = find_peaks(y,prominence=_ymin)
+    _peaks = _peaks[_valid[_peaks]]
+    _widths = peak_widths(y,_peaks,rel_height=0.5)[0]
+    seeds = [[i,max(w/FWHM_Y,1)*_dx] for i, w in zip(_peaks,_widths)]
+    seeds.sort(key=lambda s: -y[s[0]])
+    if len(seeds) >= _k:
+        return sorted(seeds[:_k])
+
+    _d2 = -gaussian_filter1d(y,2,order=2)
+    _noise = 1.4826*np.median(np.abs(_d2-np.median(_d2)))
+    _peaks_d2, _ = find_peaks(_d2,prominence=prominence*_d2[_valid].max())
+    _widths_d2 = peak_widths(_d2,_peaks_d2,rel_height=0.5)[0]
+    for i in np.argsort(-y[_peaks_d2]):
+        if len(seeds) >= _k:
+            break
+        _i = _peaks_d2[i]
+        if not _valid[_i] or y[_i] < _ymin or _d2[_i] < D2_SNR*_noise:
+            continue
+        _sigma = max(_widths_d2[i]/FWHM_D2,1)*_dx
+        if all(abs(x[_i]-x[s[0]]) > 0.5*min(_sigma,s[1]) for s in seeds):
+            seeds.append([_i,_sigma])
+    return sorted(seeds)
+
+#Seed of the largest residual of a joint fit, under the signal and apart
+#from the seeds - None if the fit leaves no positive residual
+def residual_seed(x,y,p,shape,seeds,prominence=0.05,t_min=INJECTION):
+    _r = gaussian_filter1d(y-multi_model(x,p,shape),2)
+    _r[(x < t_min) | (y < min_height(x,y,prominence,t_min))] = -np.inf
+    _sigma = min(s[1] for s in seeds)
+    for i, sigma in seeds:
+        _r[np.abs(x-x[i]) <= 0.5*sigma] = -np.inf
+    _i = int(np.argmax(_r))
+    if not _r[_i] > 0:
+        return None
+    return [_i,_sigma]
+
+#Initial parameters and bounds of the joint fit, from the seeds
+def initial_params(x,y,seeds,shape):
+    _dx = np.median(np.diff(x))
+    _span = x[-1]-x[0]
+    p0, lower, upper = [], [], []
+    for i, sigma in seeds:
+        _h = max(y[i],0)
+        #the centres stay on the data, the widths between the sampling step
+        #and the span of the data
+        sigma = min(max(sigma,_dx),_span)
+        _lo = max(x[i]-3*sigma,x[0])
+        _hi = min(x[i]+3*sigma,x[-1])
+        if shape == "gauss":
+            p0 += [_h,x[i],sigma]
+            lower += [0,_lo,_dx]
+            upper += [np.inf,_hi,_span]
+        else:
+            p0 += [_h*sigma*np.sqrt(2*np.pi),x[i],sigma,0]
+            lower += [0,_lo,_dx,-ALPHA_MAX]
+            upper += [np.inf,_hi,_span,ALPHA_MAX]
+    return [np.array(p0),(np.array(lower),np.array(upper))]
+
+#Sum of the components - each one evaluated on its support only
+def multi_model(x,p,shape):
+    fct, jac, npar = SHAPES[shape]
+    _y = np.zeros(len(x))
+    for block in p.reshape(-1,npar):
+        _sl = _support(x,block[1],block[2])
+        _y[_sl] += fct(x[_sl],block)
+    return _y
+
+def multi_eq(p,x,y,shape):
+    return multi_model(x,p,shape) - y
+
+#Sparse block Jacobian - one column block per component, rows on its support
+def multi_jac(p,x,y,shape):
+    fct, jac, npar = SHAPES[shape]
+    rows, cols, vals = [], [], []
+    for k, block in enumerate(p.reshape(-1,npar)):
+        _sl = _support(x,block[1],block[2])
+        _idx = np.arange(_sl.start,_sl.stop)
+        rows.append(np.repeat(_idx,npar))
+        cols.append(np.tile(np.arange(k*npar,(k+1)*npar),len(_idx)))
+        vals.append(jac(x[_sl],block).ravel())
+    return csr_matrix((np.concatenate(vals),
+                       (np.concatenate(rows),np.concatenate(cols))),
+                      shape=(len(x),len(p)))
+
+#Area, retention time (apex), height and standard deviation of a component
+def peak_stats(block,shape):
+    if shape == "gauss":
+        amp, loc, scale = block
+        area = amp*scale*np.sqrt(2*np.pi)
+        return [area,loc,amp,scale]
+    amp, loc, scale, alpha = block
+    _delta = alpha/np.sqrt(1+alpha**2)
+    _std = scale*np.sqrt(1-2*_delta**2/np.pi)
+    _xx = np.linspace(loc-4*scale,loc+4*scale,4001)
+    _yy = skew_norm(_xx,block)
+    return [amp,_xx[np.argmax(_yy)],_yy.max(),_std]
+
+#Resolution of two neighbouring peaks - baseline widths of 4 sigma
+def resolution(t1,std1,t2,std2):
+    return 2*(t2-t1)/(4*std1+4*std2)
+
+#Least-squares fit of the components of the seeds
+def _joint_fit(x,y,seeds,shape):
+    p0, bounds = initial_params(x,y,seeds,shape)
+    return least_squares(multi_eq, p0, jac=multi_jac, bounds=bounds,
+                         loss="soft_l1", f_scale=0.1, tr_solver="lsmr",
+                         x_scale="jac", args=(x,y,shape))
+
+#Joint fit of k components
+# Returns the (k,npar) parameters, a list of per-peak dicts (sorted by
+# retention time, the resolution is with the next peak) and the
+# OptimizeResult of least_squares. If the signal and its curvature give
+# fewer than k seeds, the missing ones are put on the largest residuals of
+# the fit of the others.
+def deconvolve(x,y,k=None,shape="skew_norm",seeds=None,t_min=INJECTION):
+    if seeds is None:
+        seeds = seed_peaks(x,y,k,t_min=t_min)
+    if not seeds:
+        raise ValueError(f"no peak to deconvolve after {t_min} min")
+    res = _joint_fit(x,y,seeds,shape)
+    while k is not None and len(seeds) < k:
+        _seed = residual_seed(x,y,res.x,shape,seeds,t_min=t_min)
+        if _seed is None:
+            break
+        seeds = sorted(seeds+[_seed])
+        res = _joint_fit(x,y,seeds,shape)
+    npar = SHAPES[shape][2]
+    params = res.x.reshape(-1,npar)
+
+    peaks = []
+    for block in params:
+        area, t_r, height, std = peak_stats(block,shape)
+        peaks.append({
+                "A": block[0],
+                "x0": block[1],
+                "sigma": block[2],
+                "alpha": block[3] if shape == "skew_norm" else 0,
+                "area": area,
+                "tR": t_r,
+                "height": height,
+                "std": std
+                })
+    _order = np.argsort([p["tR"] for p in peaks])
+    params = params[_order]
+    peaks = [peaks[i] for i in _order]
+    for i, peak in enumerate(peaks):
+        peak["peak"] = i+1
+        if i+1 < len(peaks):
+            _next = peaks[i+1]
+            peak["resolution"] = resolution(peak["tR"],peak["std"],
+                                            _next["tR"],_next["std"])
+        else:
+            peak["resolution"] = np.nan
+    return [params,peaks,res]
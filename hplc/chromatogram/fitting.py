@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.signal import find_peaks, peak_widths
+from scipy.special import erf
+
+#FUNCTIONS
+#Gaussian function
+def gauss(x, params):
+    amp, x0, sigma = params
+    return amp*np.exp(-(x-x0)**2/(2*sigma**2))
+
+#Skew-normal function
+def skew_norm(x,params):
+    amp, loc, scale, alpha = params
+    _x = alpha*(x-loc)/scale
+    norm = np.sqrt(2*np.pi*scale**2)**-1* np.exp(
+            -((x-loc)**2)/(2*scale**2)
+            )
+    cdf = 0.5*(1+erf(_x/np.sqrt(2)))
+    return amp*2*norm*cdf
+
+#Jacobian of the Gaussian function - columns d/dA, d/dx0, d/dsigma
+def gauss_jac(x,params):
+    amp, x0, sigma = params
+    _dx = x-x0
+    _e = np.exp(-_dx**2/(2*sigma**2))
+    _g = amp*_e
+    return np.column_stack((_e, _g*_dx/sigma**2, _g*_dx**2/sigma**3))
+
+#Jacobian of the skew-normal function - columns d/dA, d/dloc, d/dscale,
+#d/dalpha
+def skew_norm_jac(x,params):
+    amp, loc, scale, alpha = params
+    _u = (x-loc)/scale
+    norm = np.sqrt(2*np.pi*scale**2)**-1* np.exp(-_u**2/2)
+    cdf = 0.5*(1+erf(alpha*_u/np.sqrt(2)))
+    pdf = np.exp(-(alpha*_u)**2/2)/np.sqrt(2*np.pi)
+    _d_amp = 2*norm*cdf
+    _d_loc = 2*amp*norm*(_u*cdf - alpha*pdf)/scale
+    _d_scale = 2*amp*norm*((_u**2-1)*cdf - alpha*_u*pdf)/scale
+    _d_alpha = 2*amp*norm*pdf*_u
+    return np.column_stack((_d_amp,_d_loc,_d_scale,_d_alpha))
+
+#Least squares equation
+def lsq_eq(p,fct,x,y):
+    return fct(x,p) - y
+
+#Jacobian of the least squares equation, for the models of MODEL_JAC
+def lsq_jac(p,fct,x,y):
+    return MODEL_JAC[fct](x,p)
+
+MODEL_JAC = {gauss: gauss_jac, skew_norm: skew_norm_jac}
+
+#jac argument of least_squares - "analytic" or a finite difference scheme
+def _jac(jac):
+    if jac == "analytic":
+        return lsq_jac
+    return jac
+
+#Start of a fit - the warm start p0 (e.g. the fit of a replicate) if it is
+#given and inside the bounds, else the start from the detected peak
+def _start(p0,p_peak,bounds):
+    if p0 is None:
+        return [p_peak,False]
+    p0 = np.asarray(p0,dtype=float)
+    if np.all(p0 >= bounds[0]) and np.all(p0 <= bounds[1]):
+        return [p0,True]
+    return [p_peak,False]
+
+#Cost of least_squares (soft_l1 loss, f_scale 0.1) at p
+def _robust_cost(p,fct,x,y):
+    _z = (lsq_eq(p,fct,x,y)/0.1)**2
+    return 0.5*0.1**2*np.sum(2*(np.sqrt(1+_z)-1))
+
+#Least squares from the warm start, again from the peak start if the warm
+#fit is suspect, keeping the better of the two
+# A warm fit is suspect if it fails, ends on a bound, or ends with a cost
+# above the cost of the peak start - a cold fit can only do better.
+# The OptimizeResult tells which start was kept in its warm attribute.
+def _warm_least_squares(p0,p_peak,bounds,fct,x,y,jac):
+    _p0, warm = _start(p0,p_peak,bounds)
+    res_robust = least_squares(lsq_eq, _p0, jac=_jac(jac), loss="soft_l1",
+                               f_scale=0.1, args=(fct,x,y), bounds=bounds)
+    res_robust.warm = warm
+    if warm and (not res_robust.success
+                 or np.any(res_robust.active_mask != 0)
+                 or res_robust.cost > _robust_cost(p_peak,fct,x,y)):
+        res_cold = _warm_least_squares(None,p_peak,bounds,fct,x,y,jac)
+        if not res_robust.success or res_cold.cost <= res_robust.cost:
+            return res_cold
+    return res_robust
+
+def peaks_params(s):
+    _prom_p = 0.05*s.max()
+    _prom_n = 0.5*(-s).max()
+    _peaks_p, _ = find_peaks(s,prominence=_prom_p)
+    _peaks_n, _ = find_peaks(-s,prominence=_prom_n,height=0.1)
+    _widths_p = peak_widths(s, _peaks_p, rel_height=0.5)[0]
+    _widths_n = peak_widths(-s, _peaks_n, rel_height=0.5)[0]
+    _peaks = np.append(_peaks_p,_peaks_n)
+    _widths = np.append(_widths_p,_widths_n)
+    return [_peaks,_widths]
+
+#full_output returns the OptimizeResult of least_squares instead of p
+#p0 warm-starts the fit, the bounds still come from the detected peak
+def lsq_gauss_fit(x,y,jac="2-point",full_output=False,p0=None):
+    _peaks, _widths = peaks_params(y)
+    main_peak_i = np.absolute(y[_peaks]).argmax()
+    _i = _peaks[main_peak_i]
+    A0 = y[_i]
+    tau0 = x[_i]
+    sigma0 = x[_i + int(_widths[main_peak_i]/2)] - x[_i]
+    p_peak = [A0, tau0, sigma0]
+    if A0 < 0:
+        bA = [-np.inf,0]
+    else:
+        bA = [0,np.inf]
+    bounds = ([bA[0],tau0-0.1,0],[bA[1],tau0+0.1,np.inf])
+    res_robust = _warm_least_squares(p0,p_peak,bounds,gauss,x,y,jac)
+    if full_output:
+        return res_robust
+    return res_robust.x
+
+def lsq_skew_norm_fit(x,y,jac="2-point",full_output=False,p0=None):
+    _peaks, _widths = peaks_params(y)
+    main_peak_i = np.absolute(y[_peaks]).argmax()
+    _i = _peaks[main_peak_i]
+    A0 = y[_i]
+    tau0 = x[_i]
+    sigma0 = x[_i + int(_widths[main_peak_i]/2)] - x[_i]
+    p_peak = [A0, tau0, sigma0, 0]
+    if A0 < 0:
+        bA = [-np.inf,0]
+    else:
+        bA = [0,np.inf]
+#    bounds = ([bA[0],tau0-0.1,0,-np.inf],[bA[1],tau0+0.1,np.inf,np.inf])
+    bounds = ([bA[0],tau0-sigma0,0,-np.inf],[bA[1],tau0+sigma0,np.inf,np.inf])
+    res_robust = _warm_least_squares(p0,p_peak,bounds,skew_norm,x,y,jac)
+    if full_output:
+        return res_robust
+    return res_robust.x
@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+
+import os
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from .atomic import atomic_write
+
+#GLOBAL CONSTANTS
+#Downsampled trace - TRACE_POINTS means of TRACE_OVERSAMPLE points over
+#[0,TRACE_SPAN] min, normalised to unit norm
+TRACE_SPAN = 120.0
+TRACE_POINTS = 256
+TRACE_OVERSAMPLE = 8
+#Scales of the skew-normal fit of the main peak (loc, scale, alpha) - one
+#unit of feature distance each, the whole trace weighs at most 2
+FIT_SCALE = np.array([1.0, 0.1, 5.0])
+FIT_WEIGHT = 1.0
+N_FEATURES = len(FIT_SCALE)+TRACE_POINTS
+
+class LibraryIndex(object):
+    """
+    Searchable archive of baseline corrected chromatograms.
+
+    Each run is reduced to a feature vector: the skew-normal fit of its main
+    peak (retention time, width and skew) and its downsampled, normalised
+    trace. The vectors are stored in a .npz file with the path and mtime of
+    each run, so update only processes the new and modified files, and a
+    cKDTree over them answers the nearest neighbour queries.
+    """
+
+    def __init__(self,path):
+
+        self.path = path
+        self.names = []
+        self.paths = []
+        self.mtimes = np.empty(0)
+        self.features = np.empty((0,N_FEATURES))
+        self._tree = None
+        if os.path.exists(path):
+            self.load()
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(self.features)
+        return self._tree
+
+
+    def load(self):
+        with np.load(self.path) as data:
+            self.names = [str(n) for n in data["names"]]
+            self.paths = [str(p) for p in data["paths"]]
+            self.mtimes = data["mtimes"]
+            self.features = data["features"]
+        self._tree = None
+
+
+    def save(self):
+        with atomic_write(self.path) as f:
+            np.savez(f,names=np.array(self.names,dtype=str),
+                     paths=np.array(self.paths,dtype=str),
+                     mtimes=self.mtimes,features=self.features)
+
+
+    def stale(self,paths):
+        """
+        Files of paths which are not indexed, or were modified since.
+        """
+        _known = dict(zip(self.paths,self.mtimes))
+        return [path for path in paths
+                if _known.get(os.path.abspath(path)) != os.path.getmtime(path)]
+
+
+    def add(self,path,name,features):
+        _path = os.path.abspath(path)
+        _mtime = os.path.getmtime(path)
+        if _path in self.paths:
+            i = self.paths.index(_path)
+            self.names[i] = name
+            self.mtimes[i] = _mtime
+            self.features[i] = features
+        else:
+            self.names.append(name)
+            self.paths.append(_path)
+            self.mtimes = np.append(self.mtimes,_mtime)
+            self.features = np.vstack((self.features,features))
+        self._tree = None
+
+
+    def prune(self):
+        """
+        Forget the runs whose file was removed - returns their names.
+        """
+        _keep = [os.path.exists(path) for path in self.paths]
+        removed = [n for n, keep in zip(self.names,_keep) if not keep]
+        self.names = [n for n, keep in zip(self.names,_keep) if keep]
+        self.paths = [p for p, keep in zip(self.paths,_keep) if keep]
+        self.mtimes = self.mtimes[_keep]
+        self.features = self.features[_keep]
+        self._tree = None
+        return removed
+
+
+    def query(self,features,k=5):
+        """
+        k nearest runs of a feature vector - list of [name,distance] and the
+        query time (s), the tree being built on the first query.
+        """
+        k = min(k,len(self))
+        tic = time.perf_counter()
+        _dist, _idx = self.tree.query(features,k=k)
+        elapsed = time.perf_counter()-tic
+        _dist = np.atleast_1d(_dist)
+        _idx = np.atleast_1d(_idx)
+        return [[[self.names[i],float(d)] for d, i in zip(_dist,_idx)],
+                elapsed]
+
+###############################################################################
+#FUNCTIONS
+#Corrected trace downsampled onto the library grid, unit norm
+def trace_features(x,y):
+    _n = TRACE_POINTS*TRACE_OVERSAMPLE
+    _x = (np.arange(_n)+0.5)*TRACE_SPAN/_n
+    _y = np.interp(_x,x,y,left=0.0,right=0.0)
+    _y = _y.reshape(TRACE_POINTS,TRACE_OVERSAMPLE).mean(axis=1)
+    _norm = np.linalg.norm(_y)
+    if _norm > 0:
+        _y /= _norm
+    return _y
+
+#Feature vector of a fitted run (ChromatogramResult)
+def run_features(res):
+    A, loc, scale, alpha = res.p_skew_norm
+    _fit = np.array([loc,abs(scale),alpha])/FIT_SCALE
+    return np.concatenate((FIT_WEIGHT*_fit,trace_features(res.x,res.y)))
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+
+import numpy as np
+import matplotlib.pyplot as plt
+from .fitting import gauss, skew_norm
+from .deconvolution import SHAPES
+
+#GLOBAL CONSTANTS
+#seaborn "colorblind" palette, without loading seaborn
+PALETTE = ["#0173b2","#de8f05","#029e73","#d55e00","#cc78bc","#ca9161",
+           "#fbafe4","#949494","#ece133","#56b4e9"]
+#Points kept per pixel column of the figure by the trace decimation
+POINTS_PER_PX = 2
+#Fixed margins of the printed figures, as found by tight_layout on the
+#data_Steven runs - tight_layout walks every log tick of the r2 plot and takes
+#half of its rendering time
+R2_MARGINS = {"left": 0.15, "right": 0.975, "bottom": 0.065, "top": 0.97}
+CHROM_MARGINS = {"left": 0.12, "right": 0.975, "bottom": 0.12, "top": 0.94}
+
+#FUNCTIONS
+#Non-interactive backend, for printing only (batch workers, no display)
+def headless():
+    plt.switch_backend("Agg")
+
+#Min/max decimation - the lowest and highest point of n_out/2 bins, in
+#time order, so the envelope of the trace (noise, peak apexes) is kept
+def minmax_decimate(x,y,n_out):
+    _n_bins = n_out//2
+    if len(x) <= n_out or _n_bins < 1:
+        return [x,y]
+    _b = -(-len(y)//_n_bins)
+    _y = np.full(_n_bins*_b,np.nan)
+    _y[:len(y)] = y
+    _y = _y.reshape(_n_bins,_b)
+    _rows = ~np.all(np.isnan(_y),axis=1)
+    _start = _b*np.arange(_n_bins)[_rows]
+    _i = np.concatenate((_start+np.nanargmin(_y[_rows],axis=1),
+                         _start+np.nanargmax(_y[_rows],axis=1)))
+    _i = np.unique(_i)
+    return [x[_i],y[_i]]
+
+#Largest-triangle-three-buckets decimation (Steinarsson, 2013) - the first
+#and last points, and the point of each bucket making the largest triangle
+#with the previous point kept and the mean of the next bucket
+def lttb(x,y,n_out):
+    if len(x) <= n_out or n_out < 3:
+        return [x,y]
+    _edges = np.linspace(1,len(x)-1,n_out-1).astype(int)
+    _i = np.empty(n_out,dtype=int)
+    _i[0] = 0
+    _i[-1] = len(x)-1
+    a = 0
+    for k in range(n_out-2):
+        lo, hi = _edges[k], _edges[k+1]
+        _next = slice(hi,_edges[k+2] if k+2 < len(_edges) else len(x))
+        _x_avg = x[_next].mean()
+        _y_avg = y[_next].mean()
+        _area = np.abs((x[a]-_x_avg)*(y[lo:hi]-y[a])
+                       -(x[a]-x[lo:hi])*(_y_avg-y[a]))
+        a = lo+int(np.argmax(_area))
+        _i[k+1] = a
+    return [x[_i],y[_i]]
+
+DECIMATION = {"minmax": minmax_decimate, "lttb": lttb}
+
+#Trace reduced to the resolution of the current figure - method "minmax",
+#"lttb" or None
+def reduce_trace(x,y,method="minmax"):
+    if method is None or method == "none":
+        return [x,y]
+    _fig = plt.gcf()
+    _n = int(POINTS_PER_PX*_fig.get_figwidth()*_fig.dpi)
+    return DECIMATION[method](x,y,_n)
+
+#Show and/or save the current figure - fixed margins if it is only saved
+def _finish(show,save_path,margins=None):
+    if show or margins is None:
+        plt.tight_layout()
+    else:
+        plt.subplots_adjust(**margins)
+    if show:
+        plt.show()
+    if save_path is not None:
+        #Figure.savefig - pyplot.savefig draws the figure again afterwards
+        plt.gcf().savefig(save_path)
+    plt.close()
+
+#Autocorrelation plot of the BEADS cutoff scan
+def plot_r2(scan,show=False,save_path=None):
+    xx = scan.f_cuts
+    yy = scan.r2_val
+    known = scan.known
+    fig = plt.figure(figsize=[6.4,9.6])
+    gs = fig.add_gridspec(3, hspace=0)
+    axs = gs.subplots(sharex=True)
+    axs[0].semilogx(xx[known], yy[known], marker='.', ls='',
+                    label=r'$r^2$',ms=3)
+    axs[0].semilogx(xx, scan.smooth, marker='', ls='-',
+                    label=r'$r^2_\text{smooth}$',ms=3)
+    axs[1].semilogx(xx, scan.smooth_d1, label='First Derivative')
+    axs[2].semilogx(xx, scan.smooth_d2, label='Second Derivative')
+    for ax in axs.flat:
+        for i, infl in enumerate(scan.infls, 1):
+            ax.axvline(x=xx[infl], c='k')#, label=f'Inflection Point {i}')
+        ax.axvline(x=scan.cutoff,c='tab:red',ls='dashed'),
+        ax.label_outer()
+    for md1 in scan.rel_min_d1:
+        axs[1].axvline(x=xx[md1],ymax=0.5,c='tab:pink',ls='dashed')
+    for md1 in scan.rel_max_d1:
+        axs[1].axvline(x=xx[md1],ymin=0.5,c='tab:green',ls='dashed')
+    axs[0].annotate(f'{scan.r2_cut:0.4f}',
+                    xy=(scan.cutoff,1.01),
+                    xycoords=("data","axes fraction"),
+                    ha='center',
+                    color='tab:red'
+                    )
+    axs[2].set_xlabel('Cutoff frequency')
+    axs[0].set_ylabel(r'$r^2_{y-b}$')
+    axs[1].set_ylabel(r"$r^2_{y-b}$'")
+    axs[2].set_ylabel(r"$r^2_{y-b}$''")
+    axs[0].set_ylim(scan.r2_ymin,1.0)
+    axs[1].ticklabel_format(axis="y", style="sci", scilimits=[0,0])
+    axs[2].ticklabel_format(axis="y", style="sci", scilimits=[0,0])
+    axs[0].legend()
+    _finish(show,save_path,R2_MARGINS)
+
+#Raw data, baseline, corrected data and fits of a ChromatogramResult
+# The traces are decimated to the figure resolution (method of
+# reduce_trace) - the fits are drawn on as many points.
+def plot_chromatogram(res,show=False,save_path=None,decimate="minmax"):
+    palette = PALETTE
+
+    plt.plot(*reduce_trace(res.x,res.y_raw,decimate), marker='.', ls='',
+             c=palette[7], label='raw data',ms=3)
+    if res.baseline is not None:
+        plt.plot(*reduce_trace(res.x,res.y,decimate), ls='-',c=palette[5],
+                 lw=1.5, label='ajusted data')
+        plt.plot(*reduce_trace(res.x,res.baseline,decimate), ls='--',
+                 c=palette[0], lw=2.0, label='baseline')
+    if res.p_gauss is not None:
+        x_fit, y_fit = res.window(*res.fit_window)
+        _fig = plt.gcf()
+        _n = int(POINTS_PER_PX*_fig.get_figwidth()*_fig.dpi)
+        if decimate is None or decimate == "none":
+            _n = max(_n,int((x_fit.max()-x_fit.min()+0.2)/0.001))
+        x_robust = np.linspace(x_fit.min()-0.1, x_fit.max()+0.1, _n)
+        plt.plot(x_robust, gauss(x_robust,res.p_gauss), ls='--',
+                 c=palette[2], lw=2.0, label='robust gaussian fit')
+        plt.plot(x_robust, skew_norm(x_robust,res.p_skew_norm), ls='-.',
+                 c=palette[3], lw=2.0, label='robust skew-normal fit')
+    if res.p_peaks is not None:
+        fct = SHAPES[res.peak_shape][0]
+        for i, block in enumerate(res.p_peaks):
+            plt.plot(*reduce_trace(res.x,fct(res.x,block),decimate), ls=':',
+                     c=palette[4], lw=1.5,
+                     label='deconvolved peaks' if i == 0 else None)
+
+    plt.annotate(f"{'# data pts:'}{len(res.x):>6d}",
+                 xy=(1.0,1.01),
+                 xycoords=("axes fraction"),
+                 ha='right',
+                 color='tab:red'
+                )
+    plt.legend()
+    plt.xlabel('Time (min.)')
+    plt.ylabel('Intensity (a.u.)')
+    _finish(show,save_path,CHROM_MARGINS)
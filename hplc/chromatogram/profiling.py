@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+
+import json
+import time
+import resource
+import contextlib
+
+#GLOBAL CONSTANTS
+#Stages of hplc_extract, in the order of the pipeline
+STAGES = ["read","pre_process","cutoff_scan","baseline","gauss_fit",
+          "skew_norm_fit","bootstrap","deconvolution","plot"]
+
+#Profiler collecting the stages, None when profiling is off
+_ACTIVE = None
+
+class StageProfiler(object):
+    """
+    Object which will contain the wall time, CPU time (with the worker
+    processes), peak RSS and number of calls of each stage of a run.
+
+    Times are exclusive: a stage run inside another one, like the cutoff
+    scan inside the baseline correction, is not counted in the outer one.
+    """
+
+    def __init__(self):
+
+        self.stages = {}
+        self._stack = []
+
+
+    @contextlib.contextmanager
+    def activate(self):
+        """
+        Make this profiler the one profile_stage reports to.
+        """
+        global _ACTIVE
+        _previous = _ACTIVE
+        _ACTIVE = self
+        try:
+            yield self
+        finally:
+            _ACTIVE = _previous
+
+
+    @contextlib.contextmanager
+    def stage(self,name,calls=1):
+        _frame = [0.0,0.0]
+        self._stack.append(_frame)
+        _wall = time.perf_counter()
+        _cpu = cpu_time()
+        try:
+            yield
+        finally:
+            _wall = time.perf_counter()-_wall
+            _cpu = cpu_time()-_cpu
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += _wall
+                self._stack[-1][1] += _cpu
+            entry = self.stages.setdefault(
+                    name,{"calls": 0, "wall": 0.0, "cpu": 0.0, "max_rss": 0})
+            entry["calls"] += calls
+            entry["wall"] += _wall-_frame[0]
+            entry["cpu"] += _cpu-_frame[1]
+            entry["max_rss"] = max_rss()
+
+
+    def add_calls(self,name,calls):
+        """
+        Extra calls of a stage, e.g. the BEADS solves of the cutoff scan.
+        """
+        if name in self.stages:
+            self.stages[name]["calls"] += int(calls)
+
+
+    def records(self,**labels):
+        """
+        One dict per stage, in the order of STAGES, with the labels given
+        (file name, number of points...) - the JSON lines of --profile.
+        """
+        _names = sorted(self.stages,key=lambda s: (STAGES+[s]).index(s))
+        return [dict(labels,stage=name,**self.stages[name])
+                for name in _names]
+
+###############################################################################
+#FUNCTIONS
+#CPU time of this process and of its finished worker processes
+def cpu_time():
+    _self = resource.getrusage(resource.RUSAGE_SELF)
+    _children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (_self.ru_utime + _self.ru_stime
+            + _children.ru_utime + _children.ru_stime)
+
+#Peak resident set size of this process, in MB (ru_maxrss is in kB on Linux)
+def max_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+
+#Stage of the active profiler - does nothing when profiling is off
+def profile_stage(name,calls=1):
+    if _ACTIVE is None:
+        return contextlib.nullcontext()
+    return _ACTIVE.stage(name,calls)
+
+def add_calls(name,calls):
+    if _ACTIVE is not None:
+        _ACTIVE.add_calls(name,calls)
+
+#Append records (dicts) to a JSON lines file
+def write_profile(path,records):
+    with open(path,"a") as f:
+        for record in records:
+            f.write(json.dumps(record)+"\n")
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+
+import os
+import re
+import numpy as np
+from .atomic import atomic_write
+
+#GLOBAL CONSTANTS
+#Lines before the numeric block of a Vernier Format 2 export
+HEADER_LINES = 7
+SIDECAR_EXT = ".npy"
+STAMP_EXT = ".stamp"
+
+#FUNCTIONS
+#First number of a regex match, None if not found - "3pt06" reads as 3.06
+def _number(pattern,line):
+    _m = re.search(pattern,line)
+    if _m is None:
+        return None
+    return float(_m.group(1).replace("pt","."))
+
+#Structured metadata from the 7 header lines
+def parse_header(lines):
+    lines = [line.strip() for line in lines]
+    meta = {
+            "format": lines[0],
+            "title": lines[1],
+            "columns": lines[3].split("\t") if lines[3] else [],
+            "units": lines[5].split("\t") if lines[5] else [],
+            }
+    title = lines[1]
+    # SAS-124-55__13C60 PURE__LEFT__4th LG-PYE pass__3pt06 mLmin o-Xyl__
+    # 1500 uL__650 nm__1 injection__QC PURE.cmbl 5/15/2023 10:36:10 .
+    _date = re.search(r"(\d+/\d+/\d{4} \d+:\d+:\d+)",title)
+    _solvent = re.search(r"mLmin\s+([^_]+?)\s*(?:__|$)",title)
+    meta["fields"] = title.split("__") if title else []
+    meta["batch"] = meta["fields"][0] if meta["fields"] else None
+    meta["flow_rate"] = _number(r"(\d+(?:pt\d+)?)\s*mLmin",title)   #mL/min
+    meta["solvent"] = _solvent.group(1) if _solvent else None
+    meta["volume"] = _number(r"(\d+)\s*uL",title)                   #uL
+    meta["wavelength"] = _number(r"(\d+)\s*nm",title)               #nm
+    _inj = _number(r"(\d+)(?: of \d+)?\s*injection",title)
+    meta["injection"] = None if _inj is None else int(_inj)
+    meta["date"] = _date.group(1) if _date else None
+    if meta["flow_rate"] is None:
+        meta["method"] = None
+    else:
+        meta["method"] = (f"{meta['flow_rate']:g} mL/min {meta['solvent']} "
+                          f"{meta['volume']:g} uL {meta['wavelength']:g} nm")
+    return meta
+
+#Numeric block as a (n,ncol) array - one split and one float conversion
+def parse_block(block):
+    _first = block.lstrip().split(b"\n",1)[0]
+    _ncol = len(_first.split())
+    return np.array(block.split(),dtype=np.float64).reshape(-1,_ncol)
+
+#Header metadata only - the numeric block is not read
+def read_header(path):
+    with open(path,"rb") as f:
+        _head = [f.readline() for i in range(HEADER_LINES)]
+    return parse_header([line.decode("latin-1") for line in _head])
+
+def sidecar_path(path,sidecar_dir=None):
+    if sidecar_dir is None:
+        return path+SIDECAR_EXT
+    return os.path.join(sidecar_dir,os.path.basename(path)+SIDECAR_EXT)
+
+#Size and mtime (ns) of an export - Vernier appends to the file during a
+#run, so the size changes even when the clock resolution hides the write
+def file_stamp(path):
+    _stat = os.stat(path)
+    return [_stat.st_size,_stat.st_mtime_ns]
+
+#File stamp of the export a .npy sidecar was read from, saved next to it -
+#None for a sidecar written before the stamps, which is then rewritten
+def read_stamp(side):
+    try:
+        with open(side+STAMP_EXT) as f:
+            return [int(v) for v in f.read().split()]
+    except (OSError, ValueError):
+        return None
+
+#Vernier Format 2 export - header metadata and numeric block
+# With sidecar=True the numeric block is memory-mapped from a .npy file
+# next to the export (or in sidecar_dir), written on the first read with
+# the size and mtime of the export (.stamp), and rewritten whenever they
+# change.
+def read_vernier(path,sidecar=False,sidecar_dir=None):
+    _side = sidecar_path(path,sidecar_dir)
+    _fresh = (sidecar and os.path.exists(_side)
+              and read_stamp(_side) == file_stamp(path))
+    if _fresh:
+        with open(path,"rb") as f:
+            _head = [f.readline() for i in range(HEADER_LINES)]
+        data = np.load(_side,mmap_mode="r")
+    else:
+        with open(path,"rb") as f:
+            _raw = f.read()
+        _parts = _raw.split(b"\n",HEADER_LINES)
+        _head = _parts[:HEADER_LINES]
+        data = parse_block(_parts[HEADER_LINES])
+        if sidecar:
+            _stamp = file_stamp(path)
+            with atomic_write(_side) as f:
+                np.save(f,data)
+            with atomic_write(_side+STAMP_EXT,"w") as f:
+                f.write(f"{_stamp[0]:d} {_stamp[1]:d}\n")
+    meta = parse_header([line.decode("latin-1") for line in _head])
+    return [data,meta]
+
+#Time (min) and potential (mV) columns and metadata of a Vernier export
+def read_chromatogram(path,sidecar=False):
+    data, meta = read_vernier(path,sidecar)
+    return [data[:,0],data[:,1],meta]
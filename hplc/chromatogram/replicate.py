@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+
+import os
+import time
+import numpy as np
+from pybaselines import Baseline
+from .preprocess import log_transform
+from .reader import read_header, read_chromatogram
+from .baseline import r2_beads
+from .deconvolution import peak_stats
+from .result import process_file, ChromatogramResult
+from .profiling import profile_stage
+
+#GLOBAL CONSTANTS
+#Largest change of the autocorrelation at the cutoff of the first run for a
+# replicate to keep it (about 1E-4 between synthetic replicates, 0.03 to 0.06
+# between the n-Pentane runs at 320 and 360 nm)
+REPLICATE_R2_TOL = 0.02
+
+#GLOBAL LIST
+header7 = ["file","method","replicate","cutoff","r2_cut","warm_baseline",
+           "warm_fit","tR_g","area_g","tR_sn","area_sn","total"]
+header8 = ["method","distribution","n","tR","tR_rsd","area","area_rsd"]
+
+#FUNCTIONS
+#Files grouped by the method of their header (flow rate, solvent, volume and
+#wavelength) - {method: [paths]}, in the order of the files
+def group_replicates(paths,key="method"):
+    groups = {}
+    for path in paths:
+        groups.setdefault(read_header(path).get(key),[]).append(path)
+    return groups
+
+#Baseline at the cutoff of a reference run
+# The autocorrelation of the log-transformed signal is checked at that
+# cutoff, one BEADS solve instead of the scan; the full scan is run if it
+# is more than tol away from the one of the reference.
+def warm_baseline(res,reference,tol=REPLICATE_R2_TOL,**kwargs):
+    with profile_stage("cutoff_scan"):
+        _r2 = r2_beads(reference.cutoff,log_transform(res.signal,1),
+                       Baseline(x_data=res.x))
+    warm = abs(_r2-reference.scan.r2_cut) <= tol
+    if warm:
+        res.correct_baseline(f_cut=reference.cutoff,cache=kwargs.get("cache"))
+    else:
+        res.correct_baseline(**kwargs)
+    res.warm["baseline"] = bool(warm)
+    res.warm["r2_cut"] = _r2 if warm else res.scan.r2_cut
+    return res
+
+#Replicate run seeded by the cutoff and the fits of a reference run
+def process_replicate(path,reference,sidecar=False,xmin=None,xmax=None,
+                      jac="2-point",tol=REPLICATE_R2_TOL,**kwargs):
+    tic = time.perf_counter()
+    with profile_stage("read"):
+        x, y, meta = read_chromatogram(path,sidecar)
+    read_time = time.perf_counter()-tic
+    name = os.path.splitext(os.path.basename(path))[0]
+    res = ChromatogramResult(x,y,name,path,meta)
+    warm_baseline(res,reference,tol,**kwargs)
+    res.fit(xmin,xmax,jac,p0=[reference.p_gauss,reference.p_skew_norm])
+    res.timings["read"] = read_time
+    return res
+
+#Runs of one method - the first one is processed from scratch and seeds the
+#others
+# kwargs are those of the baseline correction (n_jobs, adaptive, cache,
+# decimate).
+def process_replicates(paths,sidecar=False,xmin=None,xmax=None,
+                       jac="2-point",tol=REPLICATE_R2_TOL,**kwargs):
+    tic = time.perf_counter()
+    reference = process_file(paths[0],sidecar,xmin=xmin,xmax=xmax,jac=jac,
+                             **kwargs)
+    reference.timings["total"] = time.perf_counter()-tic
+    results = [reference]
+    for path in paths[1:]:
+        tic = time.perf_counter()
+        res = process_replicate(path,reference,sidecar,xmin,xmax,jac,tol,
+                                **kwargs)
+        res.timings["total"] = time.perf_counter()-tic
+        results.append(res)
+    return results
+
+#Relative standard deviation, in %
+def rsd(values):
+    values = np.asarray(values,dtype=float)
+    if len(values) < 2:
+        return np.nan
+    return 100*values.std(ddof=1)/abs(values.mean())
+
+#Rows of the per-run table (header7)
+def replicate_rows(method,results):
+    rows = []
+    for i, res in enumerate(results):
+        area_g, t_r_g = peak_stats(res.p_gauss,"gauss")[:2]
+        area_sn, t_r_sn = peak_stats(res.p_skew_norm,"skew_norm")[:2]
+        rows.append({
+                "file": res.name,
+                "method": method,
+                "replicate": i,
+                "cutoff": res.cutoff,
+                "r2_cut": (res.scan.r2_cut if res.scan is not None
+                           else res.warm["r2_cut"]),
+                "warm_baseline": res.warm.get("baseline",False),
+                "warm_fit": res.warm.get("fit",False),
+                "tR_g": t_r_g,
+                "area_g": area_g,
+                "tR_sn": t_r_sn,
+                "area_sn": area_sn,
+                "total": res.timings["total"]
+                })
+    return rows
+
+#Retention time and area RSD over the replicates of each method (header8),
+#from the rows of replicate_rows
+def reproducibility_rows(rows):
+    _methods = []
+    for row in rows:
+        if row["method"] not in _methods:
+            _methods.append(row["method"])
+    out = []
+    for method in _methods:
+        _rows = [row for row in rows if row["method"] == method]
+        for dist, suffix in [("Gaussian","g"),("Skew-Normal","sn")]:
+            _t_r = [row["tR_"+suffix] for row in _rows]
+            _area = [row["area_"+suffix] for row in _rows]
+            out.append({
+                    "method": method,
+                    "distribution": dist,
+                    "n": len(_rows),
+                    "tR": np.mean(_t_r),
+                    "tR_rsd": rsd(_t_r),
+                    "area": np.mean(_area),
+                    "area_rsd": rsd(_area)
+                    })
+    return out
@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+
+import os
+import re
+import time
+from .preprocess import pre_process_signal
+from .reader import read_chromatogram
+from .baseline import beads
+from .fitting import lsq_gauss_fit, lsq_skew_norm_fit
+from .deconvolution import INJECTION, deconvolve
+from .bootstrap import N_BOOT, bootstrap
+from .profiling import profile_stage
+
+#GLOBAL LIST
+header1 = ["time","potential"]
+header2 = ["mol","solvent","distribution","A","x0","sigma","alpha"]
+header4 = ["mol","peak","distribution","A","x0","sigma","alpha","area","tR",
+           "height","resolution"]
+#stats table with the bootstrap standard errors and confidence intervals
+header9 = header2 + ["d"+par for par in header2[3:]] + [
+        par+end for par in header2[3:] for end in ["_lo","_hi"]]
+
+class ChromatogramResult(object):
+    """
+    Object which will contain a chromatogram, its baseline correction and
+    the Gaussian and skew-normal fits of its main peak.
+
+    warm records the steps warm-started from a replicate ("baseline",
+    "fit") and whether the start was kept.
+    """
+
+    def __init__(self,x,y_raw,name=None,path=None,meta=None):
+
+        self.path = path
+        self.name = name
+        self.meta = {} if meta is None else meta
+        self.x = x
+        self.y_raw = y_raw
+        with profile_stage("pre_process"):
+            self.signal = pre_process_signal(y_raw)
+        self.baseline = None
+        self.baseline_params = None
+        self.f_cut = None
+        self.scan = None
+        self.fit_window = None
+        self.p_gauss = None
+        self.p_skew_norm = None
+        self.boot = None
+        self.peak_shape = None
+        self.p_peaks = None
+        self.peaks = None
+        self.dead_time = None
+        self.timings = {}
+        self.warm = {}
+        self.profile = None
+
+
+    @property
+    def cutoff(self):
+        if self.scan is None:
+            return self.f_cut
+        return self.scan.cutoff
+
+
+    @property
+    def y(self):
+        """
+        Baseline corrected signal (pre-processed signal if not corrected).
+        """
+        if self.baseline is None:
+            return self.signal
+        return self.signal - self.baseline
+
+
+    def correct_baseline(self,f_cut=None,n_jobs=1,adaptive=False,cache=None,
+                         decimate=1):
+        tic = time.perf_counter()
+        self.f_cut = f_cut
+        with profile_stage("baseline"):
+            self.baseline, self.baseline_params, self.scan = beads(
+                    self.x,self.signal,f_cut,n_jobs,adaptive,cache,decimate)
+        self.timings["baseline"] = time.perf_counter()-tic
+        return self
+
+
+    def window(self,xmin=None,xmax=None):
+        """
+        Part of the corrected chromatogram strictly between xmin and xmax.
+        """
+        if xmin is None:
+            xmin = self.x.min()
+        if xmax is None:
+            xmax = self.x.max()
+        _mask = (self.x>xmin) & (self.x<xmax)
+        return [self.x[_mask],self.y[_mask]]
+
+
+    def fit(self,xmin=None,xmax=None,jac="2-point",p0=None):
+        """
+        Gaussian and skew-normal fits of the main peak - p0 = [p_gauss,
+        p_skew_norm] warm-starts them, e.g. from the fits of a replicate.
+        """
+        tic = time.perf_counter()
+        self.fit_window = [xmin,xmax]
+        x_fit, y_fit = self.window(xmin,xmax)
+        p0_g, p0_sn = [None,None] if p0 is None else p0
+        with profile_stage("gauss_fit"):
+            _res_g = lsq_gauss_fit(x_fit,y_fit,jac,True,p0_g)
+        with profile_stage("skew_norm_fit"):
+            _res_sn = lsq_skew_norm_fit(x_fit,y_fit,jac,True,p0_sn)
+        self.p_gauss = _res_g.x
+        self.p_skew_norm = _res_sn.x
+        if p0 is not None:
+            self.warm["fit"] = bool(_res_g.warm and _res_sn.warm)
+        self.timings["fit"] = time.perf_counter()-tic
+        return self
+
+
+    def bootstrap(self,n=N_BOOT,n_jobs=1,seed=0,jac="2-point"):
+        """
+        Residual bootstrap of the two fits - self.boot holds the results of
+        bootstrap.bootstrap for "gauss" and "skew_norm".
+        """
+        tic = time.perf_counter()
+        x_fit, y_fit = self.window(*self.fit_window)
+        with profile_stage("bootstrap",calls=2*n):
+            self.boot = {
+                    "gauss": bootstrap("gauss",x_fit,y_fit,self.p_gauss,
+                                       n,n_jobs,seed,jac),
+                    "skew_norm": bootstrap("skew_norm",x_fit,y_fit,
+                                           self.p_skew_norm,n,n_jobs,seed,
+                                           jac)
+                    }
+        self.timings["bootstrap"] = time.perf_counter()-tic
+        return self
+
+
+    def deconvolve(self,k=None,shape="skew_norm",xmin=None,xmax=None,
+                   t_min=None):
+        """
+        Joint fit of k overlapping components (all the detected peaks if
+        k is None) on the corrected chromatogram - no peak is seeded before
+        t_min (default: the dead time if known, else the injection region).
+        """
+        tic = time.perf_counter()
+        x_fit, y_fit = self.window(xmin,xmax)
+        if t_min is None:
+            t_min = INJECTION if self.dead_time is None else self.dead_time[0]
+        self.peak_shape = shape
+        with profile_stage("deconvolution"):
+            self.p_peaks, self.peaks, _res = deconvolve(x_fit,y_fit,k,shape,
+                                                        t_min=t_min)
+        self.timings["deconvolution"] = time.perf_counter()-tic
+        return self
+
+
+    def stats_rows(self,mol,solvent):
+        return stats_rows(mol,solvent,self.p_gauss,self.p_skew_norm,
+                          self.boot)
+
+
+    def peak_rows(self,mol):
+        """
+        Rows of the deconvolution table (header4).
+        """
+        _dist = "Gaussian" if self.peak_shape == "gauss" else "Skew-Normal"
+        rows = []
+        for peak in self.peaks:
+            _row = {"mol": mol, "peak": peak["peak"], "distribution": _dist}
+            _row.update({key: peak[key] for key in header4[3:]})
+            rows.append(_row)
+        return rows
+
+###############################################################################
+#FUNCTIONS
+#Baseline correction and fits of one chromatogram
+def process_chromatogram(x,y,name=None,path=None,baseline=True,fit=True,
+                         xmin=None,xmax=None,n_jobs=1,adaptive=False,
+                         cache=None,meta=None,jac="2-point",n_peaks=0,
+                         peak_shape="skew_norm",decimate=1,n_boot=0,seed=0,
+                         t_min=None):
+    res = ChromatogramResult(x,y,name,path,meta)
+    if baseline:
+        res.correct_baseline(n_jobs=n_jobs,adaptive=adaptive,cache=cache,
+                             decimate=decimate)
+    if fit:
+        res.fit(xmin,xmax,jac)
+        if n_boot > 0:
+            res.bootstrap(n_boot,n_jobs,seed,jac)
+    #n_peaks: 0 for no deconvolution, None for all the detected peaks
+    if n_peaks != 0:
+        res.deconvolve(n_peaks,peak_shape,xmin,xmax,t_min)
+    return res
+
+#Same as process_chromatogram, reading the data file first
+def process_file(path,sidecar=False,**kwargs):
+    tic = time.perf_counter()
+    with profile_stage("read"):
+        x, y, meta = read_chromatogram(path,sidecar)
+    read_time = time.perf_counter()-tic
+    name = os.path.splitext(os.path.basename(path))[0]
+    res = process_chromatogram(x,y,name,path,meta=meta,**kwargs)
+    res.timings["read"] = read_time
+    return res
+
+#Labels of the stats table - mol and solvent
+# The solvent comes from the file name, else from the Vernier method line.
+def file_labels(path,mol=None,meta=None):
+    filename = os.path.basename(path)
+    outname = re.match(r"(^.+).txt",filename).group(1)
+    if mol is None:
+        mol = outname.split("__")[0]
+    _solvent = re.match(r"(^.+)__LPYE",filename)
+    if _solvent:
+        solvent = _solvent.group(1)
+    elif meta and meta.get("solvent"):
+        solvent = meta["solvent"]
+    else:
+        solvent = ""
+    return [outname,mol,solvent]
+
+#Rows of the stats table (header2) for the two fits - with the standard
+#errors and confidence intervals of header9 if the bootstrap results are
+#given
+def stats_rows(mol,solvent,p_lsq_g,p_lsq_sn,boot=None):
+    A_g, x0_g, sigma_g = p_lsq_g
+    A_sn, x0_sn, sigma_sn, alpha_sn = p_lsq_sn
+    data_gauss = {
+            "mol": mol,
+            "solvent": solvent,
+            "distribution":"Gaussian",
+            "A": A_g,
+            "x0": x0_g,
+            "sigma": abs(sigma_g),
+            "alpha": 0
+            }
+    data_skew_norm = {
+            "mol": mol,
+            "solvent": solvent,
+            "distribution":"Skew-Normal",
+            "A": A_sn,
+            "x0": x0_sn,
+            "sigma": abs(sigma_sn),
+            "alpha": alpha_sn
+            }
+    if boot is not None:
+        data_gauss.update(boot_columns(boot["gauss"]))
+        data_skew_norm.update(boot_columns(boot["skew_norm"]))
+    return [data_gauss,data_skew_norm]
+
+#Standard errors and confidence intervals of a bootstrap, as header9 columns
+# (the Gaussian has no alpha, its columns are 0)
+def boot_columns(boot):
+    _npar = boot["se"].shape[0]
+    columns = {}
+    for i, par in enumerate(header2[3:]):
+        columns["d"+par] = boot["se"][i] if i < _npar else 0
+    for i, par in enumerate(header2[3:]):
+        columns[par+"_lo"] = boot["ci"][0,i] if i < _npar else 0
+        columns[par+"_hi"] = boot["ci"][1,i] if i < _npar else 0
+    return columns
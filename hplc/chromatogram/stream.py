@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+import os
+import time
+import numpy as np
+from scipy.optimize import least_squares
+from scipy.signal import find_peaks, peak_widths
+from scipy.ndimage import gaussian_filter1d
+from .reader import HEADER_LINES, parse_header, parse_block
+from .preprocess import pre_process_signal
+from .baseline import beads
+from .fitting import gauss, lsq_eq
+
+#GLOBAL CONSTANTS
+#Sliding window of the baseline correction, in samples
+STREAM_WINDOW = 600
+#BEADS cutoff when no reference run is given - typical of the data_Steven
+#runs at 1 sample/s
+STREAM_CUTOFF = 0.0015
+#Peak prominence, in robust standard deviations of the noise
+STREAM_SNR = 10
+#Narrowest peak reported (samples at half height)
+MIN_WIDTH = 3
+#FWHM/sigma of a Gaussian
+FWHM = 2*np.sqrt(2*np.log(2))
+#Seconds between two reads of the growing file
+POLL = 0.1
+
+header5 = ["peak","tR","height","A","x0","sigma","detected","latency"]
+
+class StreamProcessor(object):
+    """
+    Object which will contain the last window samples of a chromatogram
+    being acquired, their baseline correction and the peaks already eluted.
+
+    Every update solves BEADS once on the window with a fixed cutoff, so the
+    memory and the cost of an update do not grow with the run.
+    """
+
+    def __init__(self,f_cut=STREAM_CUTOFF,window=STREAM_WINDOW,snr=STREAM_SNR):
+
+        self.f_cut = f_cut
+        self.window = window
+        self.snr = snr
+        self.x = np.empty(0)
+        self.y_raw = np.empty(0)
+        self.baseline = None
+        self.n_points = 0
+        self.noise = 0.0
+        self.peak_end = -np.inf
+        self.peaks = []
+        self.latencies = []
+
+
+    @property
+    def y(self):
+        """
+        Baseline corrected window.
+        """
+        return self.y_raw - self.baseline
+
+
+    def update(self,x_new,y_new):
+        """
+        Append new samples, correct the window and return the peaks which
+        have eluted since the last update.
+        """
+        tic = time.perf_counter()
+        _first = self.n_points < 100
+        self.n_points += len(x_new)
+        self.x = np.concatenate((self.x,x_new))[-self.window:]
+        self.y_raw = np.concatenate((self.y_raw,y_new))[-self.window:]
+        if self.n_points < 100:
+            return []
+        if _first:
+            #outlier on the first point, as in pre_process_signal
+            self.y_raw[0] = pre_process_signal(self.y_raw)[0]
+        self.baseline = beads(self.x,self.y_raw,self.f_cut)[0]
+        self.update_noise()
+        new_peaks = self.detect()
+        self.latencies.append(time.perf_counter()-tic)
+        for peak in new_peaks:
+            peak["latency"] = self.latencies[-1]
+        return new_peaks
+
+
+    def update_noise(self):
+        """
+        Robust standard deviation of the noise, from the point to point
+        differences of the corrected window - the largest estimate so far,
+        the detector often reads a flat 0 before the injection.
+        """
+        _d = np.diff(self.y)
+        _noise = 1.4826*np.median(np.abs(_d-np.median(_d)))/np.sqrt(2)
+        self.noise = max(self.noise,_noise)
+
+
+    def detect(self):
+        """
+        Peaks of the window whose tail is back under half height, past the
+        last peak emitted, with a preliminary Gaussian fit (NaN if it is not
+        reliable, see prelim_fit).
+        """
+        _y = self.y
+        _ys = gaussian_filter1d(_y,2)
+        _prom = self.snr*max(self.noise,1E-12)
+        _i, _props = find_peaks(_ys,prominence=_prom)
+        _widths, _h, _left, _right = peak_widths(_ys,_i,rel_height=0.5)
+        new_peaks = []
+        for i, w, right in zip(_i,_widths,_right):
+            #noise spike, still eluting, or already emitted
+            if (w < MIN_WIDTH or right+0.5*w >= len(_y)-1
+                    or self.x[i] <= self.peak_end):
+                continue
+            _sl = slice(max(int(i-w),0),min(int(i+w)+1,len(_y)))
+            A, x0, sigma = self.prelim_fit(self.x[_sl],_y[_sl],i-_sl.start,
+                                           w/FWHM)
+            peak = {
+                    "peak": len(self.peaks)+1,
+                    "tR": self.x[i],
+                    "height": _y[i],
+                    "A": A,
+                    "x0": x0,
+                    "sigma": sigma,
+                    "detected": self.x[-1]
+                    }
+            self.peaks.append(peak)
+            self.peak_end = self.x[int(np.ceil(right))]
+            new_peaks.append(peak)
+        return new_peaks
+
+
+    def prelim_fit(self,x,y,i,width):
+        """
+        Gaussian fit (A, x0, sigma) of the samples of one peak, from its
+        apex i and its width (samples) - NaN if it failed, or if its centre
+        or width ends on a bound (the ends of the samples, one sample, their
+        span): the data do not set them.
+        """
+        _dx = (x[-1]-x[0])/(len(x)-1)
+        _sigma = np.clip(width*_dx,1.5*_dx,0.5*(x[-1]-x[0]))
+        bA = [-np.inf,0] if y[i] < 0 else [0,np.inf]
+        bounds = ([bA[0],x[0],_dx],[bA[1],x[-1],x[-1]-x[0]])
+        try:
+            res = least_squares(lsq_eq, [y[i],x[i],_sigma], loss="soft_l1",
+                                f_scale=0.1, args=(gauss,x,y), bounds=bounds)
+        except ValueError:
+            return [np.nan,np.nan,np.nan]
+        if not res.success or np.any(res.active_mask[1:] != 0):
+            return [np.nan,np.nan,np.nan]
+        return list(res.x)
+
+
+###############################################################################
+#FUNCTIONS
+#Follow a growing Vernier export
+# Yields [x,y] arrays of the complete lines written since the last read, then
+# stops once the file has not grown for idle seconds. The header metadata is
+# stored in meta (dict) as soon as the 7 header lines are there.
+def tail_vernier(path,meta=None,idle=10,poll=POLL):
+    while not os.path.exists(path):
+        time.sleep(poll)
+    with open(path,"rb") as f:
+        _head = []
+        _rest = b""
+        _last = time.perf_counter()
+        while True:
+            _chunk = f.read()
+            if not _chunk:
+                if time.perf_counter()-_last > idle:
+                    return
+                time.sleep(poll)
+                continue
+            _last = time.perf_counter()
+            _rest += _chunk
+            while len(_head) < HEADER_LINES and b"\n" in _rest:
+                _line, _rest = _rest.split(b"\n",1)
+                _head.append(_line)
+                if len(_head) == HEADER_LINES and meta is not None:
+                    meta.update(parse_header([line.decode("latin-1")
+                                              for line in _head]))
+            if len(_head) < HEADER_LINES or b"\n" not in _rest:
+                continue
+            _block, _rest = _rest.rsplit(b"\n",1)
+            _data = parse_block(_block)
+            yield [_data[:,0],_data[:,1]]
+
+#Rewrite a finished export line by line into out_path, speed times faster
+#than the acquisition (time column in min)
+def replay_vernier(path,out_path,speed=60):
+    with open(path,"rb") as f:
+        _lines = f.read().split(b"\n")
+    _t0 = time.perf_counter()
+    with open(out_path,"wb") as out:
+        out.write(b"\n".join(_lines[:HEADER_LINES])+b"\n")
+        out.flush()
+        for line in _lines[HEADER_LINES:]:
+            if not line.strip():
+                continue
+            _t = float(line.split()[0])*60/speed
+            _wait = _t-(time.perf_counter()-_t0)
+            if _wait > 0:
+                time.sleep(_wait)
+            out.write(line+b"\n")
+            out.flush()
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+import json
+import numpy as np
+from .fitting import skew_norm
+
+#GLOBAL CONSTANTS
+#Run length (min) and peaks (area, loc, scale, alpha) of the default trace,
+#close to the fullerene runs of data_Steven
+DURATION = 40
+PEAKS = [
+        [1.0, 4.0, 0.10, 0.0],
+        [6.0, 10.0, 0.25, 2.0],
+        [6.0, 15.0, 0.40, 4.0]
+        ]
+#Drifting baseline - offset, slope (mV/min), amplitude and period (min) of
+#a slow oscillation
+BASELINE = [0.5, 0.02, 0.3, 60.0]
+NOISE = 0.02            #mV
+OUTLIERS = [5.0, -3.0]  #mV added to the first and last points
+TRUTH_EXT = ".truth.json"
+
+#FUNCTIONS
+#Sum of skew-normal peaks - the chromato of thesis/ideal_chromatogram.py
+def chromato(x,peaks=PEAKS):
+    _y = np.zeros(len(x))
+    for peak in peaks:
+        _y += skew_norm(x,peak)
+    return _y
+
+#Offset, linear drift and slow oscillation of the detector
+def drift(x,baseline=BASELINE):
+    offset, slope, amp, period = baseline
+    return offset + slope*x + amp*np.sin(2*np.pi*x/period)
+
+#Synthetic trace of n points over duration minutes
+# Returns x, y and the ground truth (dict) - the peaks are skew-normal
+# functions with the parameters of lsq_skew_norm_fit, the main peak is the
+# highest one.
+def synthetic_chromatogram(n,peaks=PEAKS,baseline=BASELINE,noise=NOISE,
+                           outliers=OUTLIERS,duration=DURATION,seed=0):
+    _rng = np.random.default_rng(seed)
+    x = np.linspace(0,duration,n,endpoint=False)
+    _signal = chromato(x,peaks)
+    y = _signal + drift(x,baseline) + _rng.normal(0,noise,n)
+    if outliers is not None:
+        y[0] += outliers[0]
+        y[-1] += outliers[1]
+    _heights = [skew_norm(x,peak).max() for peak in peaks]
+    truth = {
+            "n_points": n,
+            "peaks": [list(map(float,peak)) for peak in peaks],
+            "main_peak": int(np.argmax(_heights)),
+            "baseline": list(map(float,baseline)),
+            "noise": float(noise),
+            "outliers": None if outliers is None else list(map(float,outliers)),
+            "seed": seed
+            }
+    return [x,y,truth]
+
+#Random peaks for a suite of traces - the first one is the main peak
+def random_peaks(rng,k=3,duration=DURATION):
+    _locs = np.sort(rng.uniform(0.1*duration,0.8*duration,k))
+    peaks = []
+    for i, loc in enumerate(_locs):
+        _area = rng.uniform(5,10) if i == 0 else rng.uniform(0.2,2)
+        peaks.append([_area,loc,rng.uniform(0.1,0.4),rng.uniform(0,5)])
+    return peaks
+
+#Vernier Format 2 export of a trace, as read by read_vernier
+def write_vernier(path,x,y,title="SYNTHETIC__3pt06 mLmin o-Xyl__1500 uL__"
+                                  "650 nm__1 injection__synthetic.cmbl"):
+    _head = ["Vernier Format 2",title,"Latest","Time\tPotential","t\tPot",
+             "min\tmV",""]
+    np.savetxt(path,np.column_stack((x,y)),fmt="%.12g",delimiter="\t",
+               header="\n".join(_head),comments="")
+
+#Trace and ground truth (path+TRUTH_EXT) on disk
+def write_synthetic(path,n,seed=0,**kwargs):
+    x, y, truth = synthetic_chromatogram(n,seed=seed,**kwargs)
+    write_vernier(path,x,y)
+    with open(path+TRUTH_EXT,"w") as f:
+        json.dump(truth,f,indent=1)
+    return truth
+
+def read_truth(path):
+    with open(path+TRUTH_EXT) as f:
+        return json.load(f)
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from chromatogram import process_file, BaselineCache
+from chromatogram.alignment import (common_grid, resample, align_stack,
+                                    open_stack, write_stack_meta)
+from hplc_batch import list_files
+
+#FUNCTIONS
+#Baseline corrected trace of one file, as [name,x,y]
+def corrected(path,args):
+    cache = BaselineCache(args.cache_dir) if args.nocache else None
+    res = process_file(path,
+                       sidecar=args.sidecar,
+                       fit=False,
+                       adaptive=args.adaptive,
+                       decimate=args.decimate,
+                       cache=cache)
+    return [res.name,res.x,res.y]
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_align',\
+        description='Align baseline corrected chromatograms on a shared time '
+                    'grid by FFT cross-correlation, into a memory-mapped '
+                    '.npy matrix')
+
+#Directories or glob patterns are required
+parser.add_argument("inputs",
+        nargs='+',
+        help="directories or glob patterns of .txt data files")
+
+parser.add_argument('-o','--output',
+        type=str, default="hplc_aligned.npy",
+        help='stacked matrix <ARG> (one row per run) and its grid, names '
+             'and shifts in <ARG>.json')
+
+parser.add_argument('-r','--reference',
+        type=str,
+        help='run the others are aligned on (file name, default: the first)')
+
+parser.add_argument('-w','--window',
+        type=float, nargs=2,
+        help='correlate the runs between <ARG> <ARG> min only, e.g. around '
+             'a peak common to all of them')
+
+parser.add_argument('-ms','--max_shift',
+        type=float,
+        help='largest shift searched (min)')
+
+parser.add_argument('-dx','--step',
+        type=float,
+        help='step of the grid (min, default: the finest sampling step)')
+
+parser.add_argument('-j','--jobs',
+        type=int, default=os.cpu_count(),
+        help='number of chromatograms corrected in parallel')
+
+parser.add_argument('-a','--adaptive',
+        default=0, action='store_true',
+        help='coarse-to-fine cutoff scan instead of the dense one')
+
+parser.add_argument('-d','--decimate',
+        type=int, default=1,
+        help='scan the cutoff on every <ARG>-th point, 0 for automatic')
+
+parser.add_argument('-nc','--nocache',
+        default=1, action='store_false',
+        help='do not use the baseline cache')
+
+parser.add_argument('-cd','--cache_dir',
+        type=str,
+        help='baseline cache directory')
+
+parser.add_argument('-sc','--sidecar',
+        default=0, action='store_true',
+        help='memory-map the data from .npy sidecars')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    files = list_files(args.inputs)
+    if not files:
+        print("Warning. No data file found. Exit.")
+        sys.exit(1)
+
+    tic = time.perf_counter()
+    n_jobs = max(1,min(args.jobs,len(files)))
+    if n_jobs == 1:
+        traces = list(map(corrected,files,[args]*len(files)))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            traces = list(pool.map(corrected,files,[args]*len(files)))
+    bl_time = time.perf_counter()-tic
+
+    names = [name for name, x, y in traces]
+    reference = 0
+    if args.reference is not None:
+        _ref = os.path.splitext(os.path.basename(args.reference))[0]
+        if _ref not in names:
+            print(f"Warning. Reference {args.reference} not found. Exit.")
+            sys.exit(1)
+        reference = names.index(_ref)
+
+    tic = time.perf_counter()
+    grid = common_grid([x for name, x, y in traces],args.step)
+    stack = open_stack(args.output,len(traces),grid)
+    for i, (name, x, y) in enumerate(traces):
+        stack[i] = resample(x,y,grid)
+    del traces
+    shifts, corr = align_stack(stack,grid,reference,args.window,
+                               args.max_shift)
+    stack.flush()
+    write_stack_meta(args.output,grid,names,shifts,corr,names[reference])
+    toc = time.perf_counter()
+
+    print(f"{'Run':<50}{'Shift (min)':>12}{'Corr.':>8}")
+    for name, shift, c in zip(names,shifts,corr):
+        print(f"{name[:48]:<50}{shift:>12.4f}{c:>8.3f}")
+    print(f"{len(names):d} runs x {grid[2]:d} points on a {grid[1]:g} min "
+          f"grid, reference {names[reference]}")
+    print(f"Baseline correction in {bl_time:0.4f} seconds, alignment in "
+          f"{toc-tic:0.4f} seconds")
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+import io
+import sys
+import os
+import glob
+import argparse
+import contextlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from chromatogram import (header2, header4, header9, file_labels,
+                          write_profile)
+from hplc_extract import build_parser, check_args, run, store_dead_time
+
+#GLOBAL LIST
+header3 = ["file","n_points","read","baseline","fit","bootstrap",
+           "deconvolution","plot","total"]
+
+#FUNCTIONS
+#Chromatograms of the directories and glob patterns given
+def list_files(inputs):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item,"*.txt"))))
+        else:
+            files.extend(sorted(glob.glob(item)))
+    return files
+
+#One chromatogram per worker - its printed log is returned with the results
+def run_file(path,file_args):
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            res = run(path,file_args)
+        except Exception as err:
+            print(f"Warning. {path} failed: {err}")
+            res = None
+    return [res,log.getvalue()]
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_batch',\
+        description='Run hplc_extract on every chromatogram of a directory. '
+                    'Unknown options are passed on to hplc_extract.')
+
+#Directories or glob patterns are required
+parser.add_argument("inputs",
+        nargs='+',
+        help="directories or glob patterns of .txt data files")
+
+parser.add_argument('-j','--jobs',
+        type=int, default=os.cpu_count(),
+        help='number of chromatograms processed in parallel')
+
+parser.add_argument('-os','--output_stats',
+        type=str, default="hplc_stats",
+        help='output the combined stats to <ARG>.csv, the deconvolved '
+             'peaks to <ARG>_peaks.csv and the timings to <ARG>_timings.csv')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args, extra = parser.parse_known_args()
+
+    files = list_files(args.inputs)
+    if not files:
+        print("Warning. No data file found. Exit.")
+        sys.exit(1)
+
+    #per-file arguments of hplc_extract - one process per file, no nested pool
+    file_args = build_parser().parse_args(extra + [files[0]])
+    check_args(file_args)
+    file_args.jobs = 1
+    file_args.check_adaptive = 0
+    file_args.show = 0
+
+    tic = time.perf_counter()
+    n_jobs = max(1,min(args.jobs,len(files)))
+    if n_jobs == 1:
+        results = map(run_file,files,[file_args]*len(files))
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs)
+        results = pool.map(run_file,files,[file_args]*len(files))
+
+    mol_list = list()
+    peak_list = list()
+    time_list = list()
+    for path, (res, log) in zip(files,results):
+        print(log)
+        if res is None:
+            continue
+        _times = {key: res.timings.get(key,0.0) for key in header3[2:]}
+        time_list.append({"file": os.path.basename(path),
+                          "n_points": len(res.x),
+                          **_times})
+        if file_args.nofit:
+            outname, mol, solvent = file_labels(path,meta=res.meta)
+            mol_list.extend(res.stats_rows(mol,solvent))
+        if res.peaks is not None:
+            outname, mol, solvent = file_labels(path,meta=res.meta)
+            peak_list.extend(res.peak_rows(mol))
+        if res.profile is not None:
+            write_profile(file_args.profile,res.profile)
+        if res.dead_time is not None:
+            store_dead_time(res,file_args)
+    if n_jobs > 1:
+        pool.shutdown()
+    toc = time.perf_counter()
+
+    if mol_list:
+        _header = header2 if file_args.bootstrap == 0 else header9
+        df = pd.DataFrame(mol_list,columns=_header)
+        df.to_csv(args.output_stats+".csv", index=False, header=_header)
+    if peak_list:
+        df = pd.DataFrame(peak_list)
+        df.to_csv(args.output_stats+"_peaks.csv", index=False, header=header4)
+    df = pd.DataFrame(time_list)
+    df.to_csv(args.output_stats+"_timings.csv", index=False, header=header3)
+    print(f"{len(time_list):d}/{len(files):d} chromatograms in "
+          f"{toc-tic:0.4f} seconds")
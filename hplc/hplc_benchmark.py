@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from chromatogram import process_file
+from chromatogram.deconvolution import peak_stats
+from chromatogram.synthetic import (PEAKS, NOISE, random_peaks,
+                                    write_synthetic)
+
+#GLOBAL CONSTANTS
+#Gates on the median errors of the skew-normal fit of the main peak
+# (about 0.01-0.02 min and 0.08-0.2 for 2000 to 50000 points with -a -d 0)
+X0_TOL = 0.05       #min
+SIGMA_TOL = 0.25    #relative
+
+#GLOBAL LIST
+header6 = ["n_points","seed","read","scan","beads","fit","total","n_solves",
+           "x0_sn","sigma_sn","alpha_sn","x0_g","sigma_g"]
+
+#FUNCTIONS
+#Errors of the fits against the main peak of the truth
+# skew-normal: loc, relative scale and alpha; Gaussian: apex and relative
+# standard deviation of the true peak
+def fit_errors(res,truth):
+    _true = truth["peaks"][truth["main_peak"]]
+    area, t_r, height, std = peak_stats(_true,"skew_norm")
+    A_sn, x0_sn, sigma_sn, alpha_sn = res.p_skew_norm
+    A_g, x0_g, sigma_g = res.p_gauss
+    return {
+            "x0_sn": abs(x0_sn-_true[1]),
+            "sigma_sn": abs(abs(sigma_sn)-_true[2])/_true[2],
+            "alpha_sn": abs(alpha_sn-_true[3]),
+            "x0_g": abs(x0_g-t_r),
+            "sigma_g": abs(abs(sigma_g)-std)/std
+            }
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_benchmark',\
+        description='Time hplc_extract on synthetic chromatograms and score '
+                    'the fits against the ground truth')
+
+parser.add_argument('-n','--lengths',
+        type=int, nargs='+', default=[500,2000,10000,50000],
+        help='number of data points of the traces')
+
+parser.add_argument('-s','--seeds',
+        type=int, default=3,
+        help='traces per length - seed 0 is the default trace, the others '
+             'have random peaks')
+
+parser.add_argument('-nz','--noise',
+        type=float, default=NOISE,
+        help='standard deviation of the noise (mV)')
+
+parser.add_argument('-a','--adaptive',
+        default=0, action='store_true',
+        help='coarse-to-fine cutoff scan instead of the dense one')
+
+parser.add_argument('-d','--decimate',
+        type=int, default=1,
+        help='scan the cutoff on every <ARG>-th point, 0 for automatic')
+
+parser.add_argument('-aj','--analytic_jac',
+        default=0, action='store_true',
+        help='closed-form Jacobians for the peak fits')
+
+parser.add_argument('-j','--jobs',
+        type=int, default=1,
+        help='number of processes for the BEADS cutoff scan')
+
+parser.add_argument('-x0t','--x0_tol',
+        type=float, default=X0_TOL,
+        help='exit 1 if the median error of x0 (min) is above <ARG>')
+
+parser.add_argument('-st','--sigma_tol',
+        type=float, default=SIGMA_TOL,
+        help='exit 1 if the median relative error of sigma is above <ARG>')
+
+parser.add_argument('-g','--generated',
+        type=str,
+        help='keep the synthetic traces in <ARG> (default: temporary '
+             'directory)')
+
+parser.add_argument('-o','--output',
+        type=str, default="hplc_benchmark",
+        help='output the results to <ARG>.csv')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    out_dir = args.generated or tempfile.mkdtemp()
+    os.makedirs(out_dir,exist_ok=True)
+
+    rows = list()
+    for n in args.lengths:
+        for seed in range(args.seeds):
+            _rng = np.random.default_rng(seed)
+            peaks = PEAKS if seed == 0 else random_peaks(_rng)
+            path = os.path.join(out_dir,f"synthetic_{n:d}_{seed:d}.txt")
+            truth = write_synthetic(path,n,seed,peaks=peaks,noise=args.noise)
+
+            tic = time.perf_counter()
+            res = process_file(path,
+                               n_jobs=args.jobs,
+                               adaptive=args.adaptive,
+                               decimate=args.decimate,
+                               jac="analytic" if args.analytic_jac
+                                   else "2-point")
+            total = time.perf_counter()-tic
+            scan = res.scan
+            row = {
+                    "n_points": n,
+                    "seed": seed,
+                    "read": res.timings["read"],
+                    "scan": scan.elapsed,
+                    "beads": res.timings["baseline"]-scan.elapsed,
+                    "fit": res.timings["fit"],
+                    "total": total,
+                    "n_solves": scan.n_solves
+                    }
+            row.update(fit_errors(res,truth))
+            rows.append(row)
+            print(f"{n:>7d}{seed:>4d}{total:>10.3f} s  "
+                  f"x0 {row['x0_sn']:0.4f}  sigma {row['sigma_sn']:0.4f}  "
+                  f"alpha {row['alpha_sn']:0.3f}",flush=True)
+
+    df = pd.DataFrame(rows,columns=header6)
+    df.to_csv(args.output+".csv", index=False, header=header6)
+    print("")
+    print(df.groupby("n_points")[header6[2:]].median().to_string(
+          float_format=lambda v: f"{v:0.4f}"))
+
+    #accuracy gates
+    x0_err = df["x0_sn"].median()
+    sigma_err = df["sigma_sn"].median()
+    if x0_err > args.x0_tol or sigma_err > args.sigma_tol:
+        print(f"Warning. Median errors x0 {x0_err:0.4f} / sigma "
+              f"{sigma_err:0.4f} above {args.x0_tol} / {args.sigma_tol}.")
+        sys.exit(1)
@@ -1,471 +1,415 @@
 #!/usr/bin/python3
 
-import re
 import os
+import sys
 import argparse
-#import numba
-import numpy as np
-import pandas as pd
-from scipy.optimize import least_squares
-from pybaselines import Baseline
-from scipy.signal import find_peaks, peak_widths, argrelmin, argrelmax
-from scipy.ndimage import gaussian_filter1d
-from scipy.special import erf
-from statsmodels.stats.stattools import durbin_watson as dwtest
-import matplotlib.pyplot as plt
-import seaborn as sns
+import contextlib
+import cProfile
 import time
+import numpy as np
+from chromatogram import (ADAPTIVE_TOL, DECIMATE_TOL, header1, header2,
+                          header4, header9, process_file, dense_cutoff, beads,
+                          file_labels, BaselineCache, StageProfiler,
+                          profile_stage, write_profile)
+from chromatogram.baseline import ASYMMETRY, FIT_PARABOLA, HALF_WINDOW
+from chromatogram.deconvolution import INJECTION, MAX_PEAKS
+from chromatogram.calibration import (COLUMN_DIAMETER, COLUMN_LENGTH,
+                                      ColumnCalibration, is_marker,
+                                      column_name, detect_t0)
 
 #GLOBAL LIST
-header1 = ["time","potential"]
-header2 = ["mol","solvent","distribution","A","x0","sigma","alpha"]
 mol_list = list()
 
-#FUNCTIONS
-#Check if the first and last data points are outlier
-def pre_process_signal(s):
-    _signal = np.copy(s)
-    _x0_len = round(0.01*len(s))
-    _y_max = 0.01*np.abs(np.max(s)-np.min(s))
-    _y0_med = np.median(s[:_x0_len])
-    _y0_gap = np.abs(s[0]-_y0_med)
-    _y1_med = np.median(s[-_x0_len:])
-    _y1_gap = np.abs(s[-1]-_y1_med)
-
-    if _y0_gap > _y_max:
-        _signal[0] = _y0_med
-    if _y1_gap > _y_max:
-        _signal[-1] = _y1_med
-    return _signal
-
-###############################################################################
-#Autocorrelation 
-def r2_fct(s):
-    _r2 = ((2-dwtest(s))**2)/4
-    return _r2
-
-#Basic BEADS for the autocorrelation plot
-def r2_beads(f_cut,s):
-    _asym =1.0 
-    _fp = True
-    _hw = None
-
-    _bl, _p = baseline_fitter.beads(
-            s,
-            freq_cutoff=f_cut,
-            fit_parabola=_fp,
-            asymmetry=_asym,
-            smooth_half_window=_hw
-            )
-    _s_corr = s - _bl
-    _r2 = r2_fct(_s_corr)
-    return _r2
-
-def log_transform(s,epsilon):
-    return np.log10(s-np.min(s)+epsilon)
-
-#Frequency cutoff for BEADS
-def fcutoff_beads(s):
-    tic = time.perf_counter()
-    
-    # log transform of the signal
-    _z = log_transform(s,1)
-
-    _freq_cutoff_range = np.geomspace(0.00001, 0.5, num=1000, endpoint=False)
-    
-    r2_func = lambda x: r2_beads(x,_z)
-    vr2_func = np.vectorize(r2_func)
-    r2_val = vr2_func(_freq_cutoff_range)   # y-data
-
-    smooth = gaussian_filter1d(r2_val,25)
-    smooth_d1 = np.gradient(smooth)
-    smooth_d2 = np.gradient(np.gradient(smooth))
-    infls = np.where(np.diff(np.sign(smooth_d2)))[0]
-    rel_min_d1 = argrelmin(smooth_d1)[0]
-    rel_max_d1 = argrelmax(smooth_d1)[0]
-    # How do we find the right inflection point?
-    d1_min = np.argmin(smooth_d1[infls])
-    if d1_min == 0:
-        if len(infls) == 2:
-            infl_plateau = _freq_cutoff_range[infls[d1_min]]
-            _freq_cutoff = 0.10*infl_plateau    #0.25
-        else:
-            infl_plateau = _freq_cutoff_range[infls[d1_min+1]]
-            _freq_cutoff = 0.75*infl_plateau
-    else:
-        thresh_d1 = smooth_d1[infls[d1_min-1]]
-        if ((thresh_d1 < -4E-04) and (d1_min > 2)):
-            infl_plateau = _freq_cutoff_range[infls[d1_min-3]]
-            infl_min = _freq_cutoff_range[infls[d1_min-2]]
-            shift_factor = 0.20#0.1/np.log(len(s))*np.log(20)
-        else:
-            infl_plateau = _freq_cutoff_range[infls[d1_min-1]]
-            infl_min = _freq_cutoff_range[infls[d1_min]]
-            shift_factor = 0.05#0.1/np.log(len(s))*np.log(20)
-        infl_shift = shift_factor*(infl_min-infl_plateau)
-        _freq_cutoff = infl_plateau + infl_shift #1.50*infl_plateau
-    r2_ymin = r2_val[infls[d1_min-1]]-0.05  #only for the r2 plot limit
-
-    toc = time.perf_counter()
-    print(f"Autocorrelation in {toc-tic:0.4f} seconds")
-    fi_r2_val = r2_beads(_freq_cutoff,_z)
-    print(f"{'r2 value:':<20}{fi_r2_val:0.4f}")
-
-    
-    if args.show or args.print:
-        xx = _freq_cutoff_range
-        yy = r2_val
-        fig = plt.figure(figsize=[6.4,9.6])
-        gs = fig.add_gridspec(3, hspace=0)
-        axs = gs.subplots(sharex=True)
-        axs[0].semilogx(xx, yy, marker='.', ls='',label=r'$r^2$',ms=3)
-        axs[0].semilogx(xx, smooth, marker='', ls='-',
-                        label=r'$r^2_\text{smooth}$',ms=3)
-        axs[1].semilogx(xx, smooth_d1, label='First Derivative')
-        axs[2].semilogx(xx, smooth_d2, label='Second Derivative')
-        for ax in axs.flat:
-            for i, infl in enumerate(infls, 1):
-                ax.axvline(x=xx[infl], c='k')#, label=f'Inflection Point {i}')
-            ax.axvline(x=_freq_cutoff,c='tab:red',ls='dashed'),
-            ax.label_outer()
-        for md1 in rel_min_d1:
-            axs[1].axvline(x=xx[md1],ymax=0.5,c='tab:pink',ls='dashed')
-        for md1 in rel_max_d1:
-            axs[1].axvline(x=xx[md1],ymin=0.5,c='tab:green',ls='dashed')
-        axs[0].annotate(f'{fi_r2_val:0.4f}',
-                        xy=(_freq_cutoff,1.01),
-                        xycoords=("data","axes fraction"),
-                        ha='center',
-                        color='tab:red'
-                        )
-        axs[2].set_xlabel('Cutoff frequency')
-        axs[0].set_ylabel(r'$r^2_{y-b}$')
-        axs[1].set_ylabel(r"$r^2_{y-b}$'")
-        axs[2].set_ylabel(r"$r^2_{y-b}$''")
-        axs[0].set_ylim(r2_ymin,1.0)
-        axs[1].ticklabel_format(axis="y", style="sci", scilimits=[0,0])
-        axs[2].ticklabel_format(axis="y", style="sci", scilimits=[0,0])
-        axs[0].legend()
-        plt.tight_layout()
-        if args.show:
-            plt.show()
-        if args.print:
-            filename = os.path.splitext(os.path.basename(path))[0]
-            plt.savefig(f"r2_plots/{filename}_r2.png")
-        plt.close()
-    return _freq_cutoff
-
-###############################################################################
-#BEADS baseline correction
-def beads(s):
-    # Read Navarro-Huerta et al (2017)
-    # Section 3.2: Monitoring the autocorrelation to explore the BEADS
-    #              working parameters
-    # 3.3.2. Chromatograms involving peaks with extremely different magnitude
-    # Section 3.4: Autocorrelation plot using the baseline-corrected signal
-    # Section 3.5: Application of the assisted BEADS
-
-    print(f"{'Data points:':<20}{len(s):d}")
-
-    _fcut = fcutoff_beads(s)#0.005*2000/len(s)
-    print(f"{'Cutoff frequency:':<20}{_fcut:E}")
-
-    _asym =1.0 
-    print(f"{'Asymmetry:':<20}{_asym:0.1f}")
-
-    _fp = True
-    print(f"{'Fit parabola:':<20}{str(_fp):s}")
-
-    _hw = None
-    print(f"{'Half window:':<20}{str(_hw):s}")
-
-    tic = time.perf_counter()
-    _bl, _p = baseline_fitter.beads(
-            s,
-            freq_cutoff=_fcut,
-            fit_parabola=_fp,
-            asymmetry=_asym,
-            smooth_half_window=_hw
-            )
-    toc = time.perf_counter()
-    print(f"Baseline correction in {toc-tic:0.4f} seconds")
-    return [_bl,_p]
-
-###############################################################################
-#Gaussian function
-def gauss(x, params):
-    amp, x0, sigma = params
-    return amp*np.exp(-(x-x0)**2/(2*sigma**2))
-
-#Skew-normal function
-def skew_norm(x,params):
-    amp, loc, scale, alpha = params
-    _x = alpha*(x-loc)/scale
-    norm = np.sqrt(2*np.pi*scale**2)**-1* np.exp(
-            -((x-loc)**2)/(2*scale**2)
-            )
-    cdf = 0.5*(1+erf(_x/np.sqrt(2)))
-    return amp*2*norm*cdf
-
-#Least squares equation
-def lsq_eq(p,fct,x,y):
-    return fct(x,p) - y
-
-def peaks_params(s):
-    _prom_p = 0.05*s.max()
-    _prom_n = 0.5*(-s).max()
-    _peaks_p, _ = find_peaks(s,prominence=_prom_p)
-    _peaks_n, _ = find_peaks(-s,prominence=_prom_n,height=0.1)
-    _widths_p = peak_widths(s, _peaks_p, rel_height=0.5)[0]
-    _widths_n = peak_widths(-s, _peaks_n, rel_height=0.5)[0]
-    _peaks = np.append(_peaks_p,_peaks_n)
-    _widths = np.append(_widths_p,_widths_n)
-    return [_peaks,_widths]
-
-def lsq_gauss_fit(x,y):
-    _peaks, _widths = peaks_params(y)
-    main_peak_i = np.absolute(y[_peaks]).argmax()
-    _i = _peaks[main_peak_i]
-    A0 = y[_i]
-    tau0 = x[_i]
-    sigma0 = x[_i + int(_widths[main_peak_i]/2)] - x[_i]
-    p0 = [A0, tau0, sigma0]
-    if A0 < 0:
-        bA = [-np.inf,0]
-    else:
-        bA = [0,np.inf]
-    bounds = ([bA[0],tau0-0.1,0],[bA[1],tau0+0.1,np.inf])
-    res_robust = least_squares(lsq_eq, p0, loss="soft_l1",
-                              f_scale=0.1, args=(gauss,x,y),
-                               bounds=bounds)
-    return res_robust.x
-
-def lsq_skew_norm_fit(x,y):
-    _peaks, _widths = peaks_params(y)
-    main_peak_i = np.absolute(y[_peaks]).argmax()
-    _i = _peaks[main_peak_i]
-    A0 = y[_i]
-    tau0 = x[_i]
-    sigma0 = x[_i + int(_widths[main_peak_i]/2)] - x[_i]
-    p0 = [A0, tau0, sigma0, 0]
-    if A0 < 0:
-        bA = [-np.inf,0]
-    else:
-        bA = [0,np.inf]
-#    bounds = ([bA[0],tau0-0.1,0,-np.inf],[bA[1],tau0+0.1,np.inf,np.inf])
-    bounds = ([bA[0],tau0-sigma0,0,-np.inf],[bA[1],tau0+sigma0,np.inf,np.inf])
-    res_robust = least_squares(lsq_eq, p0, loss="soft_l1",
-                               f_scale=0.1, args=(skew_norm,x,y),
-                               bounds=bounds)
-    return res_robust.x
-
 ###############################################################################
 #PARSER
-#Create parser
-parser = argparse.ArgumentParser(prog='hplc_parser',\
-        description='Parse data from .txt file')
-
-#File is required
-parser.add_argument("filename",
-        help="the .inp data file")
-
-parser.add_argument('-s','--show',
-        default=0, action='store_true',
-        help='show the plot windows')
-
-parser.add_argument('-p','--print',
-        default=0, action='store_true',
-        help='print the plots')
-
-parser.add_argument('-e','--export_bldata',
-        default=0, action='store_true',
-        help='export the baseline corrected data to filename_bl.txt')
-
-parser.add_argument('-o','--output_csv',
-        default=0, action='store_true',
-#        type=str,
-        help='output data to <ARG>.csv')
-
-parser.add_argument('-os','--output_stats',
-        type=str,
-        help='output stats to <ARG>.csv')
-
-parser.add_argument('-n','--nofit',
-        default=1, action='store_false',
-        help='do not fit the chromatogram')
-
-parser.add_argument('-nb','--nobaseline',
-        default=1, action='store_false',
-        help='do not correct the baseline')
-
-parser.add_argument('-x0','--startx',
-        type=float,
-        help='start fitting the gaussian at x min')
-
-parser.add_argument('-x1','--endx',
-        type=float,
-        help='end fitting the gaussian at x min')
-
-#Parse arguments
-args = parser.parse_args()
-
-#change values according to arguments
-fit_data = args.nofit
-do_bl = args.nobaseline
-
-#check if startx and endx are equal - exif if true.
-if args.startx is not None and args.endx is not None and args.startx == args.endx:
-    print("Warning. x0 and x1 are equal. Exit.")
-    sys.exit(1)
-
-#check if startx < 0 - exit if true.
-if args.startx:
-    if args.startx < 0:
-        print("Warning. x0 < 0. Exit.")
+def build_parser():
+    #Create parser
+    parser = argparse.ArgumentParser(prog='hplc_parser',\
+            description='Parse data from .txt file')
+
+    #File is required
+    parser.add_argument("filename",
+            help="the .inp data file")
+
+    parser.add_argument('-s','--show',
+            default=0, action='store_true',
+            help='show the plot windows')
+
+    parser.add_argument('-p','--print',
+            default=0, action='store_true',
+            help='print the plots')
+
+    parser.add_argument('-pm','--plot_decimation',
+            type=str, default="minmax", choices=["minmax","lttb","none"],
+            help='reduce the plotted traces to the figure resolution by '
+                 'min/max or largest-triangle-three-buckets decimation')
+
+    parser.add_argument('-e','--export_bldata',
+            default=0, action='store_true',
+            help='export the baseline corrected data to filename_bl.txt')
+
+    parser.add_argument('-o','--output_csv',
+            default=0, action='store_true',
+    #        type=str,
+            help='output data to <ARG>.csv')
+
+    parser.add_argument('-os','--output_stats',
+            type=str,
+            help='output stats to <ARG>.csv')
+
+    parser.add_argument('-n','--nofit',
+            default=1, action='store_false',
+            help='do not fit the chromatogram')
+
+    parser.add_argument('-nb','--nobaseline',
+            default=1, action='store_false',
+            help='do not correct the baseline')
+
+    parser.add_argument('-j','--jobs',
+            type=int, default=1,
+            help='number of processes for the BEADS cutoff scan and the '
+                 'bootstrap')
+
+    parser.add_argument('-a','--adaptive',
+            default=0, action='store_true',
+            help='coarse-to-fine cutoff scan instead of the dense one')
+
+    parser.add_argument('-d','--decimate',
+            type=int, default=1,
+            help='scan the cutoff on every <ARG>-th point, 0 to size it from '
+                 'the narrowest peak - the baseline is solved on all points')
+
+    parser.add_argument('-ca','--check_adaptive',
+            default=0, action='store_true',
+            help='also run the dense scan and exit 2 if the adaptive cutoff '
+                 'is off by more than ADAPTIVE_TOL, or the baseline of the '
+                 'decimated scan by more than DECIMATE_TOL')
+
+    parser.add_argument('-nc','--nocache',
+            default=1, action='store_false',
+            help='do not use the baseline cache')
+
+    parser.add_argument('-cd','--cache_dir',
+            type=str,
+            help='baseline cache directory (default: $HPLC_CACHE_DIR or '
+                 '~/.cache/hplc_extract)')
+
+    parser.add_argument('-sc','--sidecar',
+            default=0, action='store_true',
+            help='memory-map the data from a .npy sidecar, written next to '
+                 'the .txt file on the first read')
+
+    parser.add_argument('-aj','--analytic_jac',
+            default=0, action='store_true',
+            help='closed-form Jacobians for the peak fits instead of '
+                 'finite differences')
+
+    parser.add_argument('-bs','--bootstrap',
+            type=int, default=0,
+            help='standard errors and confidence intervals of the fits from '
+                 '<ARG> residual resamples')
+
+    parser.add_argument('-sd','--seed',
+            type=int, default=0,
+            help='seed of the bootstrap resamples')
+
+    parser.add_argument('-dk','--deconvolve',
+            type=int, default=-1,
+            help='joint fit of <ARG> overlapping peaks, 0 for all the '
+                 f'detected peaks (at most {MAX_PEAKS})')
+
+    parser.add_argument('-ds','--deconvolve_shape',
+            type=str, default="skew_norm", choices=["gauss","skew_norm"],
+            help='peak shape of the deconvolution')
+
+    parser.add_argument('-tm','--t_min',
+            type=float, default=INJECTION,
+            help='no deconvolved peak before <ARG> min (injection region, '
+                 'or the t0 of the column)')
+
+    parser.add_argument('-t0','--dead_time',
+            default=0, action='store_true',
+            help='detect the t0 peak of unretained marker runs (n-Pentane) '
+                 'and store the porosity and phase ratio of the column')
+
+    parser.add_argument('-col','--column',
+            type=str,
+            help='column of the calibration (default: from the run title)')
+
+    parser.add_argument('-cal','--calibration',
+            type=str,
+            help='column calibration file (default: $HPLC_CALIBRATION or '
+                 '~/.cache/hplc_extract/columns.json)')
+
+    parser.add_argument('-dc','--diameter',
+            type=float, default=COLUMN_DIAMETER,
+            help='inner diameter of the column (mm)')
+
+    parser.add_argument('-cl','--length',
+            type=float, default=COLUMN_LENGTH,
+            help='length of the column (mm)')
+
+    parser.add_argument('-pr','--profile',
+            type=str,
+            help='append the wall time, CPU time, peak RSS and calls of '
+                 'each stage to <ARG> (JSON lines)')
+
+    parser.add_argument('-cp','--cprofile',
+            type=str,
+            help='dump the cProfile statistics to <ARG>/<filename>.prof')
+
+    parser.add_argument('-x0','--startx',
+            type=float,
+            help='start fitting the gaussian at x min')
+
+    parser.add_argument('-x1','--endx',
+            type=float,
+            help='end fitting the gaussian at x min')
+    return parser
+
+def check_args(args):
+    #check if startx and endx are equal - exif if true.
+    if args.startx is not None and args.endx is not None and args.startx == args.endx:
+        print("Warning. x0 and x1 are equal. Exit.")
         sys.exit(1)
 
-#check if endx < 0 - exit if true.
-if args.endx:
-    if args.endx < 0:
-        print("Warning. x1 < 0. Exit.")
-        sys.exit(1)
+    #check if startx < 0 - exit if true.
+    if args.startx:
+        if args.startx < 0:
+            print("Warning. x0 < 0. Exit.")
+            sys.exit(1)
+
+    #check if endx < 0 - exit if true.
+    if args.endx:
+        if args.endx < 0:
+            print("Warning. x1 < 0. Exit.")
+            sys.exit(1)
+
+#-dk value as the n_peaks of process_file - 0 (off) if not given,
+#None for all the detected peaks
+def n_peaks(args):
+    if args.deconvolve < 0:
+        return 0
+    return args.deconvolve or None
+
+#Store the dead time of a marker run in the column calibration - done by the
+#main process, the batch workers only detect it
+def store_dead_time(res,args):
+    column = args.column or column_name(res.meta)
+    if column is None or res.meta.get("flow_rate") is None:
+        print(f"Warning. No column or flow rate for {res.name}, t0 not "
+              f"stored.")
+        return None
+    t0, dt0 = res.dead_time
+    entry = ColumnCalibration(args.calibration).add_run(
+            column,res.name,t0,dt0,res.meta["flow_rate"],args.diameter,
+            args.length)
+    print(f"{'Column:':<20}{column:s} ({len(entry['runs']):d} marker runs)")
+    print(f"{'t0:':<20}{entry['t0']:0.4f} +/- {entry['dt0']:0.4f} min")
+    print(f"{'Dead volume:':<20}{entry['vm']:0.1f} +/- {entry['dvm']:0.1f} uL")
+    print(f"{'Porosity:':<20}{entry['porosity']:0.4f} +/- "
+          f"{entry['dporosity']:0.4f}")
+    print(f"{'Phase ratio F:':<20}{entry['F']:0.4f} +/- {entry['dF']:0.4f}")
+    return entry
 
-#Data processing
-path = args.filename
-print(path)
-data =  np.loadtxt(path,skiprows=7)
-xdata = data[:,0]
-ydata_ini = data[:,1]
-signal = pre_process_signal(ydata_ini)
-
-#baseline correction
-if do_bl:
-    baseline_fitter = Baseline(x_data=xdata)
-    baseline, params = beads(signal)
-    ydata = signal - baseline
-else:
-    ydata = signal
-ajusted_data = np.array([xdata,ydata]).T
-
-#if export_bldata is given - txt generation of the bl corrected chromatogram
-if args.export_bldata and do_bl:
-    filename = os.path.splitext(os.path.basename(path))[0]
-    line1 = "Baseline corrected chromatogram of:\n"
-    header = line1 + filename +"\n\n\n\n\n" 
-    np.savetxt(filename+"_bl.txt", ajusted_data,
-               delimiter = ' ',
-               header=header
-              )
-
-#if output_csv is given - csv generation of the chromatogram
-if args.output_csv:
-    filename = os.path.splitext(os.path.basename(path))[0]
-    df = pd.DataFrame(data)
-    df.to_csv(filename+".csv", index=False, header=header1)
-
-#if startx argument is given - x-axis range
-if args.startx:
-    xmin_fit = args.startx
-else:
-    xmin_fit = min(xdata)
-
-#if endx argument is given - x-axis range
-if args.endx:
-    xmax_fit = args.endx
-else:
-    xmax_fit = max(xdata)
-
-data_fit = ajusted_data[(xdata>xmin_fit) & (xdata<xmax_fit)]
-xdata_fit = data_fit[:,0]
-ydata_fit = data_fit[:,1]
-
-#Curve fit with data
-if fit_data:
-    x_robust = np.arange(xdata_fit.min()-0.1, xdata_fit.max()+0.1, 0.001)
-    #Gaussian curve fit
-    p_lsq_g = lsq_gauss_fit(xdata_fit,ydata_fit)
-    y_robust_g = gauss(x_robust,p_lsq_g)
-    A_g, x0_g, sigma_g = p_lsq_g
-    sigma_g = abs(sigma_g)
-
-#    FWHM = 2.35482*sigma_g
-    print('The Amplitude of the gaussian fit is', A_g)
-    print('The center of the gaussian fit is', x0_g)
-    print('The sigma of the gaussian fit is', sigma_g,"\n")
-#    print('The FWHM of the gaussian fit is', FWHM)
-
-    #Skew-Normal curve fit
-    p_lsq_sn = lsq_skew_norm_fit(xdata_fit,ydata_fit)
-    y_robust_sn = skew_norm(x_robust,p_lsq_sn)
-    A_sn, x0_sn, sigma_sn, alpha_sn = p_lsq_sn
-    sigma_sn = abs(sigma_sn)
-    
-    print('The Amplitude of the skew-normal fit is', A_sn)
-    print('The center of the skew-normal fit is', x0_sn)
-    print('The sigma of the skew-normal fit is', sigma_sn)
-    print('The skew parameter of the skew-normal fit is', alpha_sn)
+###############################################################################
+#Processing of one chromatogram with the command line options
+# With --profile the stage records are returned in res.profile.
+def run(path,args):
+    profiler = StageProfiler()
+    _active = profiler.activate() if args.profile else contextlib.nullcontext()
+    _cprof = cProfile.Profile() if args.cprofile else None
+    with _active:
+        if _cprof is not None:
+            _cprof.enable()
+        try:
+            res = extract(path,args)
+        finally:
+            if _cprof is not None:
+                _cprof.disable()
+    if _cprof is not None:
+        os.makedirs(args.cprofile,exist_ok=True)
+        _cprof.dump_stats(os.path.join(args.cprofile,res.name+".prof"))
+    if args.profile:
+        res.profile = profiler.records(file=os.path.basename(path),
+                                       n_points=len(res.x))
+    return res
+
+def extract(path,args):
+    tic = time.perf_counter()
+    print(path)
+    cache = BaselineCache(args.cache_dir) if args.nocache else None
+    #startx/endx of 0 mean the whole chromatogram, as before
+    res = process_file(path,
+                       sidecar=args.sidecar,
+                       baseline=args.nobaseline,
+                       fit=args.nofit,
+                       xmin=args.startx or None,
+                       xmax=args.endx or None,
+                       n_jobs=args.jobs,
+                       adaptive=args.adaptive,
+                       decimate=args.decimate,
+                       cache=cache,
+                       jac="analytic" if args.analytic_jac else "2-point",
+                       n_peaks=n_peaks(args),
+                       peak_shape=args.deconvolve_shape,
+                       t_min=args.t_min,
+                       n_boot=args.bootstrap,
+                       seed=args.seed)
+
+    #baseline correction
+    if args.nobaseline:
+        scan = res.scan
+        print(f"{'Data points:':<20}{len(res.x):d}")
+        print(f"{'BEADS solves:':<20}{scan.n_solves:d}")
+        if scan.decimate > 1:
+            print(f"{'Scan decimation:':<20}{scan.decimate:d}")
+        if scan.cached:
+            print(f"Autocorrelation from cache ({scan.elapsed:0.4f} seconds)")
+        else:
+            print(f"Autocorrelation in {scan.elapsed:0.4f} seconds")
+        print(f"{'r2 value:':<20}{scan.r2_cut:0.4f}")
+
+        #compare the adaptive and/or decimated scan with the dense one
+        if (args.adaptive or scan.decimate > 1) and args.check_adaptive:
+            _fc_dense = dense_cutoff(res.x,res.signal,args.jobs)
+            rel_diff = abs(scan.cutoff-_fc_dense)/_fc_dense
+            print(f"{'Dense cutoff:':<20}{_fc_dense:E}")
+            print(f"{'Relative diff.:':<20}{rel_diff:0.4f}")
+            if scan.decimate > 1:
+                _bl_dense = beads(res.x,res.signal,_fc_dense)[0]
+                _y_dense = res.signal-_bl_dense
+                bl_diff = (np.abs(res.baseline-_bl_dense).max()
+                           /np.abs(_y_dense).max())
+                print(f"{'Baseline diff.:':<20}{bl_diff:0.4f}")
+                if bl_diff > DECIMATE_TOL:
+                    print(f"Warning. Decimated baseline off by more than "
+                          f"{DECIMATE_TOL}.")
+                    sys.exit(2)
+            elif rel_diff > ADAPTIVE_TOL:
+                print(f"Warning. Adaptive cutoff off by more than "
+                      f"{ADAPTIVE_TOL}.")
+                sys.exit(2)
+
+        print(f"{'Cutoff frequency:':<20}{scan.cutoff:E}")
+        print(f"{'Asymmetry:':<20}{ASYMMETRY:0.1f}")
+        print(f"{'Fit parabola:':<20}{str(FIT_PARABOLA):s}")
+        print(f"{'Half window:':<20}{str(HALF_WINDOW):s}")
+        bl_time = res.timings["baseline"]
+        if not scan.cached:
+            bl_time -= scan.elapsed
+        print(f"Baseline correction in {bl_time:0.4f} seconds")
+
+    #dead time of an unretained marker run
+    if args.dead_time and args.nobaseline and is_marker(res.meta):
+        try:
+            res.dead_time = detect_t0(res.x,res.y)
+            print(f"{'Dead time t0:':<20}{res.dead_time[0]:0.4f} +/- "
+                  f"{res.dead_time[1]:0.4f} min")
+        except ValueError as err:
+            print(f"Warning. {err}.")
+
+    #if export_bldata is given - txt generation of the bl corrected chromatogram
+    if args.export_bldata and args.nobaseline:
+        line1 = "Baseline corrected chromatogram of:\n"
+        header = line1 + res.name +"\n\n\n\n\n" 
+        np.savetxt(res.name+"_bl.txt", np.array([res.x,res.y]).T,
+                   delimiter = ' ',
+                   header=header
+                  )
+
+    #if output_csv is given - csv generation of the chromatogram
+    if args.output_csv:
+        import pandas as pd
+        df = pd.DataFrame(np.array([res.x,res.y_raw]).T)
+        df.to_csv(res.name+".csv", index=False, header=header1)
+
+    #Curve fit with data
+    if args.nofit:
+        A_g, x0_g, sigma_g = res.p_gauss
+    #    FWHM = 2.35482*sigma_g
+        print('The Amplitude of the gaussian fit is', A_g)
+        print('The center of the gaussian fit is', x0_g)
+        print('The sigma of the gaussian fit is', abs(sigma_g),"\n")
+    #    print('The FWHM of the gaussian fit is', FWHM)
+
+        A_sn, x0_sn, sigma_sn, alpha_sn = res.p_skew_norm
+        print('The Amplitude of the skew-normal fit is', A_sn)
+        print('The center of the skew-normal fit is', x0_sn)
+        print('The sigma of the skew-normal fit is', abs(sigma_sn))
+        print('The skew parameter of the skew-normal fit is', alpha_sn)
+
+    #Bootstrap standard errors and confidence intervals
+    if res.boot is not None:
+        print("")
+        _conf = 100*res.boot["gauss"]["confidence"]
+        print(f"{'Parameter':<22}{'SE':>12}{f'{_conf:g}% CI':>28}")
+        for dist, shape in [("Gaussian","gauss"),("Skew-Normal","skew_norm")]:
+            _boot = res.boot[shape]
+            for i, par in enumerate(header2[3:3+_boot["se"].shape[0]]):
+                _lo, _hi = _boot["ci"][:,i]
+                print(f"{dist+' '+par:<22}{_boot['se'][i]:>12.4E}"
+                      f"{_lo:>14.4E}{_hi:>14.4E}")
+        print(f"Bootstrap of {res.boot['skew_norm']['n']:d} resamples in "
+              f"{res.timings['bootstrap']:0.4f} seconds")
+
+    #Deconvolution of the overlapping peaks
+    if res.peaks is not None:
+        print("")
+        print(f"{'Peak':<6}{'tR':>12}{'Area':>14}{'Height':>14}"
+              f"{'Resolution':>12}")
+        for peak in res.peaks:
+            print(f"{peak['peak']:<6d}{peak['tR']:>12.4f}{peak['area']:>14.4E}"
+                  f"{peak['height']:>14.4E}{peak['resolution']:>12.3f}")
+        print(f"Deconvolution in {res.timings['deconvolution']:0.4f} seconds")
+
+    plot_tic = time.perf_counter()
+    if args.show or args.print:
+        with profile_stage("plot"):
+            #matplotlib is only loaded when a figure is made
+            from chromatogram.plotting import (headless, plot_r2,
+                                               plot_chromatogram)
+            if not args.show:
+                headless()
+            if args.nobaseline:
+                plot_r2(res.scan,args.show,
+                        f"r2_plots/{res.name}_r2.png" if args.print else None)
+            plot_chromatogram(res,args.show,
+                              f"images/{res.name}.png" if args.print
+                              else None,args.plot_decimation)
+        print("")
+    res.timings["plot"] = time.perf_counter()-plot_tic
+    res.timings["total"] = time.perf_counter()-tic
+    return res
+
+def main():
+    #Parse arguments
+    args = build_parser().parse_args()
+    check_args(args)
+
+    res = run(args.filename,args)
+    if args.profile:
+        write_profile(args.profile,res.profile)
+    if res.dead_time is not None:
+        store_dead_time(res,args)
 
     #if output_stats is given - csv generation
-    if args.output_stats:
-        mol = args.output_stats
-        path = args.filename
-        filename = os.path.basename(path)
-        outname = re.match(r"(^.+).txt",filename).group(1)
-        solvent = re.match(r"(^.+)__LPYE",filename).group(1)
-        data_gauss = {
-                "mol": mol,
-                "solvent": solvent,
-                "distribution":"Gaussian",
-                "A": A_g,
-                "x0": x0_g,
-                "sigma": sigma_g,
-                "alpha": 0
-                }
-        data_skew_norm = {
-                "mol": mol,
-                "solvent": solvent,
-                "distribution":"Skew-Normal",
-                "A": A_sn,
-                "x0": x0_sn,
-                "sigma": sigma_sn,
-                "alpha": alpha_sn
-                }
-        mol_list.append(data_gauss)
-        mol_list.append(data_skew_norm)
-        df = pd.DataFrame(mol_list)
-        df.to_csv(outname+"_"+mol+".csv", index=False, header=header2)
-
-
-if args.show or args.print:
-    palette = sns.color_palette("colorblind")
-    sns.set_palette(palette)
-
-    plt.plot(xdata, ydata_ini, marker='.', ls='', c=palette[7],
-             label='raw data',ms=3)
-    if do_bl:
-        plt.plot(xdata, ydata, ls='-',c=palette[5], lw=1.5,
-                label='ajusted data')
-        plt.plot(xdata, baseline, ls='--',c=palette[0], lw=2.0,
-                label='baseline')
-    if fit_data:
-        plt.plot(x_robust, y_robust_g, ls='--', c=palette[2], lw=2.0,
-                 label='robust gaussian fit')
-        plt.plot(x_robust, y_robust_sn, ls='-.', c=palette[3], lw=2.0,
-                 label='robust skew-normal fit')
-
-    plt.annotate(f"{'# data pts:'}{len(xdata):>6d}",
-                 xy=(1.0,1.01),
-                 xycoords=("axes fraction"),
-                 ha='right',
-                 color='tab:red'
-                )
-    plt.legend()
-    plt.xlabel('Time (min.)')
-    plt.ylabel('Intensity (a.u.)')
-    plt.tight_layout()
-    if args.show:
-        plt.show()
-    if args.print:
-        filename = os.path.splitext(os.path.basename(path))[0]
-        plt.savefig(f"images/{filename}.png")
-    print("")
+    if args.output_stats and args.nofit:
+        import pandas as pd
+        outname, mol, solvent = file_labels(args.filename,args.output_stats,
+                                            res.meta)
+        mol_list.extend(res.stats_rows(mol,solvent))
+        _header = header2 if res.boot is None else header9
+        df = pd.DataFrame(mol_list,columns=_header)
+        df.to_csv(outname+"_"+mol+".csv", index=False, header=_header)
+
+    #if output_stats is given - csv of the deconvolved peaks
+    if args.output_stats and res.peaks is not None:
+        import pandas as pd
+        outname, mol, solvent = file_labels(args.filename,args.output_stats,
+                                            res.meta)
+        df = pd.DataFrame(res.peak_rows(mol))
+        df.to_csv(outname+"_"+mol+"_peaks.csv", index=False, header=header4)
+
+if __name__ == "__main__":
+    main()
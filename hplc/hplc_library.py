@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from chromatogram import process_file, BaselineCache
+from chromatogram.library import LibraryIndex, run_features
+from hplc_batch import list_files
+
+#FUNCTIONS
+#Features of one file, as [name,features] - None if it cannot be fitted
+def features(path,args):
+    cache = BaselineCache(args.cache_dir) if args.nocache else None
+    try:
+        res = process_file(path,
+                           sidecar=args.sidecar,
+                           xmin=args.startx or None,
+                           xmax=args.endx or None,
+                           adaptive=args.adaptive,
+                           decimate=args.decimate,
+                           cache=cache)
+    except Exception as err:
+        print(f"Warning. {path} failed: {err}")
+        return None
+    return [res.name,run_features(res)]
+
+def map_files(files,args):
+    n_jobs = max(1,min(args.jobs,len(files)))
+    if n_jobs == 1:
+        return list(map(features,files,[args]*len(files)))
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(features,files,[args]*len(files)))
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_library',\
+        description='Index an archive of chromatograms and find the runs '
+                    'closest to new ones (k nearest neighbours)')
+
+parser.add_argument("inputs",
+        nargs='*',
+        help="directories or glob patterns of .txt data files to index - "
+             "only the new and modified files are processed")
+
+parser.add_argument('-l','--library',
+        type=str, default="hplc_library.npz",
+        help='index file')
+
+parser.add_argument('-q','--query',
+        type=str, nargs='+',
+        help='runs (.txt) to look up in the library')
+
+parser.add_argument('-k','--neighbours',
+        type=int, default=5,
+        help='number of runs returned per query')
+
+parser.add_argument('-j','--jobs',
+        type=int, default=os.cpu_count(),
+        help='number of chromatograms processed in parallel')
+
+parser.add_argument('-a','--adaptive',
+        default=0, action='store_true',
+        help='coarse-to-fine cutoff scan instead of the dense one')
+
+parser.add_argument('-d','--decimate',
+        type=int, default=1,
+        help='scan the cutoff on every <ARG>-th point, 0 for automatic')
+
+parser.add_argument('-nc','--nocache',
+        default=1, action='store_false',
+        help='do not use the baseline cache')
+
+parser.add_argument('-cd','--cache_dir',
+        type=str,
+        help='baseline cache directory')
+
+parser.add_argument('-sc','--sidecar',
+        default=0, action='store_true',
+        help='memory-map the data from .npy sidecars')
+
+parser.add_argument('-x0','--startx',
+        type=float,
+        help='start fitting at x min')
+
+parser.add_argument('-x1','--endx',
+        type=float,
+        help='end fitting at x min')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    index = LibraryIndex(args.library)
+
+    #incremental update of the index
+    if args.inputs:
+        files = list_files(args.inputs)
+        tic = time.perf_counter()
+        removed = index.prune()
+        stale = index.stale(files)
+        for path, item in zip(stale,map_files(stale,args)):
+            if item is not None:
+                index.add(path,*item)
+        if stale or removed:
+            index.save()
+        print(f"{len(stale):d} runs indexed, {len(removed):d} removed, "
+              f"{len(index):d} in {args.library} "
+              f"({time.perf_counter()-tic:0.4f} seconds)")
+
+    if not args.query:
+        sys.exit(0)
+    if len(index) == 0:
+        print("Warning. The library is empty. Exit.")
+        sys.exit(1)
+
+    #nearest runs of the queries
+    for path, item in zip(args.query,map_files(args.query,args)):
+        if item is None:
+            continue
+        name, _features = item
+        neighbours, elapsed = index.query(_features,args.neighbours)
+        print("")
+        print(f"{name} ({1000*elapsed:0.3f} ms)")
+        for rank, (match, dist) in enumerate(neighbours,1):
+            print(f"{rank:>4d}  {match[:50]:<52}{dist:>10.4f}")
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from chromatogram import BaselineCache
+from chromatogram.replicate import (REPLICATE_R2_TOL, header7, header8,
+                                    group_replicates, process_replicates,
+                                    replicate_rows, reproducibility_rows)
+from hplc_batch import list_files
+
+#FUNCTIONS
+#One method per worker - rows of the per-run table
+def run_group(method,paths,args):
+    cache = BaselineCache(args.cache_dir) if args.nocache else None
+    try:
+        results = process_replicates(paths,
+                                     sidecar=args.sidecar,
+                                     xmin=args.startx or None,
+                                     xmax=args.endx or None,
+                                     jac="analytic" if args.analytic_jac
+                                         else "2-point",
+                                     tol=args.r2_tol,
+                                     adaptive=args.adaptive,
+                                     decimate=args.decimate,
+                                     cache=cache)
+    except Exception as err:
+        print(f"Warning. {method} failed: {err}")
+        return []
+    return replicate_rows(method,results)
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_replicates',\
+        description='Process replicate injections: the runs are grouped by '
+                    'the method of their header, the first run of a method '
+                    'seeds the cutoff and the fits of the others')
+
+#Directories or glob patterns are required
+parser.add_argument("inputs",
+        nargs='+',
+        help="directories or glob patterns of .txt data files")
+
+parser.add_argument('-j','--jobs',
+        type=int, default=os.cpu_count(),
+        help='number of methods processed in parallel')
+
+parser.add_argument('-a','--adaptive',
+        default=0, action='store_true',
+        help='coarse-to-fine cutoff scan instead of the dense one')
+
+parser.add_argument('-d','--decimate',
+        type=int, default=1,
+        help='scan the cutoff on every <ARG>-th point, 0 to size it from '
+             'the narrowest peak')
+
+parser.add_argument('-rt','--r2_tol',
+        type=float, default=REPLICATE_R2_TOL,
+        help='rescan the cutoff of a replicate if its autocorrelation at '
+             'the first cutoff is more than <ARG> away')
+
+parser.add_argument('-aj','--analytic_jac',
+        default=0, action='store_true',
+        help='closed-form Jacobians for the peak fits')
+
+parser.add_argument('-nc','--nocache',
+        default=1, action='store_false',
+        help='do not use the baseline cache')
+
+parser.add_argument('-cd','--cache_dir',
+        type=str,
+        help='baseline cache directory')
+
+parser.add_argument('-sc','--sidecar',
+        default=0, action='store_true',
+        help='memory-map the data from .npy sidecars')
+
+parser.add_argument('-x0','--startx',
+        type=float,
+        help='start fitting at x min')
+
+parser.add_argument('-x1','--endx',
+        type=float,
+        help='end fitting at x min')
+
+parser.add_argument('-os','--output_stats',
+        type=str, default="hplc_replicates",
+        help='output the runs to <ARG>.csv and the retention time and area '
+             'RSD to <ARG>_rsd.csv')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    files = list_files(args.inputs)
+    if not files:
+        print("Warning. No data file found. Exit.")
+        sys.exit(1)
+
+    groups = group_replicates(files)
+    _methods = list(groups)
+
+    tic = time.perf_counter()
+    n_jobs = max(1,min(args.jobs,len(groups)))
+    if n_jobs == 1:
+        results = map(run_group,_methods,[groups[m] for m in _methods],
+                      [args]*len(groups))
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs)
+        results = pool.map(run_group,_methods,[groups[m] for m in _methods],
+                           [args]*len(groups))
+
+    rows = list()
+    for method, _rows in zip(_methods,results):
+        print(f"{str(method):<40}{len(_rows):>4d} runs")
+        for row in _rows:
+            _warm = "warm" if row["warm_baseline"] else "scan"
+            print(f"  {row['file'][:50]:<52}{_warm:<6}"
+                  f"{row['tR_sn']:>10.4f}{row['area_sn']:>12.4E}"
+                  f"{row['total']:>10.3f} s")
+        rows.extend(_rows)
+    if n_jobs > 1:
+        pool.shutdown()
+    toc = time.perf_counter()
+
+    rsd_rows = reproducibility_rows(rows)
+    print("")
+    print(f"{'Method':<40}{'Distribution':<14}{'n':>4}{'tR RSD %':>10}"
+          f"{'Area RSD %':>12}")
+    for row in rsd_rows:
+        print(f"{str(row['method']):<40}{row['distribution']:<14}"
+              f"{row['n']:>4d}{row['tR_rsd']:>10.3f}{row['area_rsd']:>12.3f}")
+
+    df = pd.DataFrame(rows,columns=header7)
+    df.to_csv(args.output_stats+".csv", index=False, header=header7)
+    df = pd.DataFrame(rsd_rows,columns=header8)
+    df.to_csv(args.output_stats+"_rsd.csv", index=False, header=header8)
+    print(f"{len(rows):d}/{len(files):d} chromatograms in "
+          f"{toc-tic:0.4f} seconds")
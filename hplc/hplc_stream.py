@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from chromatogram import BaselineCache, process_file
+from chromatogram.stream import (STREAM_CUTOFF, STREAM_WINDOW, STREAM_SNR,
+                                 header5, StreamProcessor, tail_vernier,
+                                 replay_vernier)
+
+###############################################################################
+#PARSER
+#Create parser
+parser = argparse.ArgumentParser(prog='hplc_stream',\
+        description='Follow a Vernier export while it is acquired and print '
+                    'the peaks as they elute')
+
+#File is required
+parser.add_argument("filename",
+        help="the growing .txt data file")
+
+parser.add_argument('-r','--replay',
+        type=float,
+        help='replay a finished data file <ARG> times faster than the '
+             'acquisition instead of following it')
+
+parser.add_argument('-rf','--reference',
+        type=str,
+        help='finished run of the same method - BEADS cutoff from its '
+             '(adaptive, cached) scan')
+
+parser.add_argument('-f','--freq_cutoff',
+        type=float, default=STREAM_CUTOFF,
+        help='BEADS cutoff frequency if no reference run is given')
+
+parser.add_argument('-w','--window',
+        type=int, default=STREAM_WINDOW,
+        help='sliding window of the baseline correction (data points)')
+
+parser.add_argument('-sn','--snr',
+        type=float, default=STREAM_SNR,
+        help='peak prominence in noise standard deviations')
+
+parser.add_argument('-i','--idle',
+        type=float, default=10,
+        help='stop when the file has not grown for <ARG> seconds')
+
+parser.add_argument('-os','--output_stats',
+        type=str,
+        help='output the peaks to <ARG>.csv')
+
+if __name__ == "__main__":
+    #Parse arguments
+    args = parser.parse_args()
+
+    if args.window < 100:
+        print("Warning. window < 100. Exit.")
+        sys.exit(1)
+
+    #cutoff of a finished run of the same method
+    f_cut = args.freq_cutoff
+    if args.reference:
+        f_cut = process_file(args.reference,fit=False,adaptive=True,
+                             cache=BaselineCache()).cutoff
+    print(f"{'Cutoff frequency:':<20}{f_cut:E}")
+
+    path = args.filename
+    _tmp = None
+    if args.replay:
+        #copy of the run written by the replay thread, removed at the end
+        _tmp = tempfile.mkdtemp()
+        path = os.path.join(_tmp,os.path.basename(args.filename))
+        replay = threading.Thread(target=replay_vernier,
+                                  args=(args.filename,path,args.replay),
+                                  daemon=True)
+        replay.start()
+
+    meta = {}
+    stream = StreamProcessor(f_cut,args.window,args.snr)
+    print(f"{'Peak':<6}{'tR':>10}{'Height':>12}{'x0':>10}{'sigma':>10}"
+          f"{'Detected':>10}{'Update (ms)':>13}")
+    try:
+        for x_new, y_new in tail_vernier(path,meta,args.idle):
+            for peak in stream.update(x_new,y_new):
+                print(f"{peak['peak']:<6d}{peak['tR']:>10.3f}"
+                      f"{peak['height']:>12.4f}{peak['x0']:>10.3f}"
+                      f"{peak['sigma']:>10.3f}{peak['detected']:>10.3f}"
+                      f"{1000*peak['latency']:>13.1f}",flush=True)
+    finally:
+        if _tmp is not None:
+            shutil.rmtree(_tmp,ignore_errors=True)
+
+    if meta.get("title"):
+        print(meta["title"])
+    _lat = 1000*np.array(stream.latencies)
+    print(f"{'Data points:':<20}{stream.n_points:d}")
+    print(f"{'Updates:':<20}{len(_lat):d}")
+    if len(_lat):
+        print(f"{'Update time (ms):':<20}{_lat.mean():0.1f} mean, "
+              f"{_lat.max():0.1f} max")
+
+    #if output_stats is given - csv of the peaks
+    if args.output_stats and stream.peaks:
+        df = pd.DataFrame(stream.peaks)
+        df.to_csv(args.output_stats+".csv", index=False, header=header5)
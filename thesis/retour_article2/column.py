@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+
+import os
+import json
+from uncertainties import ufloat
+
+#GLOBAL CONSTANTS
+#Column calibration written by hplc_extract.py -t0 from the n-Pentane runs
+CALIBRATION = os.environ.get("HPLC_CALIBRATION",
+        os.path.join(os.path.expanduser("~"),".cache","hplc_extract",
+                     "columns.json"))
+COLUMN = "LG-PYE"
+#Values of the article, used when the column has not been calibrated
+T0 = [3.127,0.195]  #min
+FLOWRATE = 3.06     #mL/min
+DC = 10             #mm
+COL_L = 250         #mm
+
+#functions
+#t0 (ufloat), flow rate and geometry of the column
+def load_column(column=COLUMN,path=CALIBRATION):
+    try:
+        with open(path) as f:
+            entry = json.load(f)[column]
+    except (OSError, ValueError, KeyError):
+        print(f"Warning. No calibration of {column} in {path}, "
+              f"using the values of the article.")
+        return [ufloat(*T0),FLOWRATE,DC,COL_L]
+    return [ufloat(entry["t0"],entry["dt0"]),entry["flow_rate"],
+            entry["diameter"],entry["length"]]
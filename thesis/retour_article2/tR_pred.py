@@ -7,18 +7,16 @@ from scipy.optimize import curve_fit
 from uncertainties import ufloat
 from uncertainties import unumpy as unp
 from uncertainties.umath import log
+from column import load_column
 
 #GLOBAL CONSTANTS
 DATAPATH = "./data/lab_radius.csv"
 df = pd.read_csv(DATAPATH,comment='#')
-t0 = ufloat(3.127,0.195)
+t0, flowrate, dc, col_L = load_column()
 ipyrb = 199.0859    #119.0352    #181.4246   #199.0859   #222.4543
 apyrb = 177.9258    # 92.5758    #182.8184   #177.9258   #180.2662
 ie_pyr = 7.16072    # 7.91720    # 7.10623   # 7.16072   # 7.61163
-flowrate = 3.06
 vm = t0*flowrate*1000
-dc = 10
-col_L = 250
 porosity = vm/(math.pi*(dc/2)**2*col_L)
 F = (1-porosity)/porosity
 logF = log(F)